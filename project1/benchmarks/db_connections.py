@@ -0,0 +1,187 @@
+"""
+Compare request latency with and without database connection reuse.
+
+Starts gunicorn on the production settings three times -- connecting once per
+request, keeping persistent connections (``CONN_MAX_AGE``) and borrowing from
+the psycopg pool -- and hits ``/health/``, which runs one query, with the same
+concurrent load:
+
+    DB_NAME=app DB_USER_NM=app DB_USER_PW=secret DB_IP=127.0.0.1 DB_PORT=5432 \\
+        python benchmarks/db_connections.py --requests 2000 --concurrency 20
+
+The ``DB_*`` variables must point at a PostgreSQL server; a throwaway one can
+be started with ``docker run -e POSTGRES_PASSWORD=secret -p 5432:5432
+postgres:16``. A local server answers a handshake much faster than one across
+the network, so ``--latency`` puts a TCP relay in front of it that delays
+every packet by half the given round-trip time in each direction. Requires
+``gunicorn`` and ``psycopg[pool]``.
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SETUPS = [
+    ("new connection", {"DB_CONN_POOL": "false", "DB_CONN_MAX_AGE": "0"}),
+    ("persistent", {"DB_CONN_POOL": "false", "DB_CONN_MAX_AGE": "600"}),
+    ("pool", {"DB_CONN_POOL": "true"}),
+]
+
+
+def relay(source, target, delay):
+    try:
+        while data := source.recv(65536):
+            time.sleep(delay)
+            target.sendall(data)
+    except OSError:
+        pass
+    finally:
+        source.close()
+        target.close()
+
+
+def start_latency_relay(host, port, latency):
+    """Forward a local port to ``host:port`` with ``latency`` ms round trips."""
+    listener = socket.create_server(("127.0.0.1", 0))
+    delay = latency / 2000
+
+    def serve():
+        while True:
+            client, _ = listener.accept()
+            server = socket.create_connection((host, port))
+            for source, target in ((client, server), (server, client)):
+                threading.Thread(
+                    target=relay, args=(source, target, delay), daemon=True
+                ).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/health/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def run_client(port, count):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    errors = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        connection.request("GET", "/health/")
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        errors += response.status != 200
+    connection.close()
+    return latencies, errors
+
+
+def bench(overrides, args, port, db_port):
+    env = dict(
+        os.environ,
+        PIPELINE="production",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "benchmark"),
+        DB_IP="127.0.0.1" if args.latency else os.environ["DB_IP"],
+        DB_PORT=str(db_port),
+        # One database only, so the setups differ in connection reuse alone.
+        DB_REPLICA_HOSTS="",
+        WEB_CONCURRENCY=str(args.workers),
+        **overrides,
+    )
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "core.wsgi:application",
+        "--workers",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+    ]
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)
+    try:
+        wait_until_up(port)
+        run_client(port, 20)  # warm up every worker
+        per_client = args.requests // args.concurrency
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(
+                pool.map(
+                    lambda _: run_client(port, per_client), range(args.concurrency)
+                )
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(errors for _, errors in results)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": quantiles[49] * 1000,
+        "p95": quantiles[94] * 1000,
+        "p99": quantiles[98] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="simulated database round-trip time in milliseconds",
+    )
+    parser.add_argument("--port", type=int, default=8775)
+    args = parser.parse_args()
+
+    db_port = int(os.environ.get("DB_PORT", "5432"))
+    if args.latency:
+        db_port = start_latency_relay(os.environ["DB_IP"], db_port, args.latency)
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.workers} workers x {args.threads} threads, "
+        f"{args.latency:g} ms added database latency"
+    )
+    print(f"{'setup':<18}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  errors")
+    for offset, (name, overrides) in enumerate(SETUPS):
+        result = bench(overrides, args, args.port + offset, db_port)
+        print(
+            f"{name:<18}{result['rps']:>9.1f}{result['p50']:>9.1f}"
+            f"{result['p95']:>9.1f}{result['p99']:>9.1f}  {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Primary/replica database routing.
+
+``PrimaryReplicaRouter`` sends reads to the aliases listed in
+``DATABASE_REPLICAS`` and everything else to ``default``, the primary. Reads
+stay on the primary when they could miss the caller's own writes:
+
+* after any write made earlier in the same request (or, outside requests, in
+  the same thread);
+* inside a transaction on the primary;
+* for ``DB_PRIMARY_STICKY_SECONDS`` after a request that wrote, through a
+  cookie set by ``PrimaryStickinessMiddleware``, so that the redirect following
+  a form post sees the new data.
+
+Each replica's lag is measured at most every ``DB_REPLICA_LAG_CHECK_INTERVAL``
+seconds per process. Replicas more than ``DB_REPLICA_MAX_LAG`` seconds behind,
+or that cannot be reached, are skipped until the next check; with none left,
+reads fall back to the primary.
+"""
+
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = "db_primary_until"
+
+# Seconds the replica is behind, 0 when it has replayed everything it was sent.
+POSTGRESQL_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+_pinned = contextvars.ContextVar("db_pinned_to_primary", default=False)
+_wrote = contextvars.ContextVar("db_wrote", default=False)
+
+
+def pin_to_primary():
+    """Route the rest of this request's (or thread's) reads to the primary."""
+    _pinned.set(True)
+
+
+def pinned_to_primary():
+    return _pinned.get()
+
+
+def measure_lag(alias):
+    """Replication lag of ``alias`` in seconds; stand-in replicas have none."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaHealth:
+    """Per-process record of which replicas are fresh enough to read from."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def usable(self, alias):
+        interval = getattr(settings, "DB_REPLICA_LAG_CHECK_INTERVAL", 1.0)
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+            if checked is not None and now - checked[0] < interval:
+                return checked[1]
+            # Claim the check so that concurrent requests keep the old answer.
+            self._checked[alias] = (now, checked[1] if checked else False)
+        try:
+            lag = measure_lag(alias)
+        except DatabaseError:
+            lag = None
+        max_lag = getattr(settings, "DB_REPLICA_MAX_LAG", 5.0)
+        ok = lag is not None and lag <= max_lag
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), ok)
+        return ok
+
+    def clear(self):
+        with self._lock:
+            self._checked.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", ())
+        if (
+            not replicas
+            or pinned_to_primary()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        usable = [alias for alias in replicas if replica_health.usable(alias)]
+        return random.choice(usable) if usable else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Scope the router's pinning to the request, and keep reads on the primary
+    for a few seconds after a request that wrote. Keep it first in
+    ``MIDDLEWARE`` so that every other middleware's queries are covered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        pinned_token, wrote_token = _pinned.set(sticky), _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+
+        if wrote:
+            seconds = getattr(settings, "DB_PRIMARY_STICKY_SECONDS", 10)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
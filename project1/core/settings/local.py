@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from . import get_secret
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Keeps reads on the primary after a write (see core.db_router).
+    "core.db_router.PrimaryStickinessMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,6 +84,20 @@ DATABASES = {
     }
 }
 
+# Optional stand-in read replica for trying out the production routing: a
+# second SQLite file, e.g. a copy of db.sqlite3 made with
+# `sqlite3 db.sqlite3 ".backup replica.sqlite3"`. Copy it again to "replicate".
+DB_REPLICA_NAME = get_secret("DB_REPLICA_NAME")
+if DB_REPLICA_NAME:
+    DATABASES["replica1"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": DB_REPLICA_NAME,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DB_PRIMARY_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Keeps reads on the primary after a write (see core.db_router).
+    "core.db_router.PrimaryStickinessMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,9 +90,63 @@ DATABASES = {
         "PASSWORD": DB_USER_PW,
         "HOST": DB_IP,
         "PORT": DB_PORT,
+        # Check a reused connection before handing it to a request.
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
     }
 }
 
+# Connection reuse. With DB_CONN_POOL on (the default) every worker process
+# keeps a psycopg pool of DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections per
+# database and requests borrow from it. Otherwise each worker thread keeps its
+# own connection for DB_CONN_MAX_AGE seconds; 0 connects once per request.
+# Turn the pool off behind a transaction-mode PgBouncer.
+#
+# The server has to accept DB_POOL_MAX_SIZE connections from every worker:
+# when DB_MAX_CONNECTIONS (the share of max_connections left for this app) is
+# set, the pool is capped to DB_MAX_CONNECTIONS // WEB_CONCURRENCY, the worker
+# count gunicorn also reads.
+DB_CONN_POOL = get_secret("DB_CONN_POOL", "true").lower() in ("1", "true", "yes")
+if DB_CONN_POOL:
+    DB_POOL_MAX_SIZE = int(get_secret("DB_POOL_MAX_SIZE", "4"))
+    DB_MAX_CONNECTIONS = get_secret("DB_MAX_CONNECTIONS")
+    if DB_MAX_CONNECTIONS:
+        WEB_CONCURRENCY = int(get_secret("WEB_CONCURRENCY", "1"))
+        DB_POOL_MAX_SIZE = max(
+            1, min(DB_POOL_MAX_SIZE, int(DB_MAX_CONNECTIONS) // WEB_CONCURRENCY)
+        )
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": min(int(get_secret("DB_POOL_MIN_SIZE", "1")), DB_POOL_MAX_SIZE),
+        "max_size": DB_POOL_MAX_SIZE,
+        # Seconds a request waits for a free connection before failing.
+        "timeout": float(get_secret("DB_POOL_TIMEOUT", "10")),
+        # Idle connections above min_size are closed after max_idle seconds;
+        # every connection is replaced after max_lifetime.
+        "max_idle": float(get_secret("DB_POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(get_secret("DB_POOL_MAX_LIFETIME", "3600")),
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(get_secret("DB_CONN_MAX_AGE", "60"))
+
+# Read replicas: DB_REPLICA_HOSTS is a comma-separated list of host[:port]
+# streaming copies of the primary, reached with the same database name and
+# credentials. Reads go to a replica less than DB_REPLICA_MAX_LAG seconds
+# behind; writes, and reads that follow a write, stay on the primary.
+DB_REPLICA_HOSTS = get_secret("DB_REPLICA_HOSTS", "")
+for index, replica in enumerate(filter(None, DB_REPLICA_HOSTS.split(",")), start=1):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DB_PORT,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DB_REPLICA_MAX_LAG = float(get_secret("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(get_secret("DB_REPLICA_LAG_CHECK_INTERVAL", "1"))
+DB_PRIMARY_STICKY_SECONDS = int(get_secret("DB_PRIMARY_STICKY_SECONDS", "10"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
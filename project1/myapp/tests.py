@@ -1 +1,132 @@
-# Create your tests here.
+import contextvars
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connections, transaction
+from django.db.utils import load_backend
+from django.http import JsonResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from core import db_router
+from myapp import views
+
+
+def list_users(request):
+    return JsonResponse(
+        {"users": list(User.objects.values_list("username", flat=True))}
+    )
+
+
+@csrf_exempt
+def create_user(request):
+    User.objects.create(username=request.POST["username"])
+    return list_users(request)
+
+
+urlpatterns = [
+    path("users/", list_users),
+    path("users/create/", create_user),
+]
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    DATABASE_REPLICAS=["replica1"],
+    DB_REPLICA_LAG_CHECK_INTERVAL=0,
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Routing between two SQLite files standing in for primary and replica."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # A connection created outside DATABASES, which test cases allow.
+        settings_dict = {
+            **connections.settings["default"],
+            "NAME": str(Path(directory.name) / "replica.sqlite3"),
+        }
+        replica = load_backend(settings_dict["ENGINE"]).DatabaseWrapper(
+            settings_dict, "replica1"
+        )
+        connections["replica1"] = replica
+        self.addCleanup(self.remove_replica, replica)
+        db_router.replica_health.clear()
+        self.replicate()
+
+    def remove_replica(self, replica):
+        replica.close()
+        del connections["replica1"]
+
+    def replicate(self):
+        """Bring the replica up to date with the primary."""
+        primary, replica = connections["default"], connections["replica1"]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
+
+    def usernames(self, response):
+        return json.loads(response.content)["users"]
+
+    def test_reads_go_to_the_replica(self):
+        User.objects.create(username="alice")
+        self.assertEqual(self.usernames(self.client.get("/users/")), [])
+        self.replicate()
+        self.assertEqual(self.usernames(self.client.get("/users/")), ["alice"])
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        response = self.client.post("/users/create/", {"username": "bob"})
+        self.assertEqual(self.usernames(response), ["bob"])
+        self.assertIn(db_router.STICKY_COOKIE, response.cookies)
+        # The cookie keeps the next request on the primary too.
+        self.assertEqual(self.usernames(self.client.get("/users/")), ["bob"])
+        del self.client.cookies[db_router.STICKY_COOKIE]
+        self.assertEqual(self.usernames(self.client.get("/users/")), [])
+
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        User.objects.create(username="carol")
+        with override_settings(DB_REPLICA_MAX_LAG=5):
+            with mock.patch.object(db_router, "measure_lag", return_value=60):
+                response = self.client.get("/users/")
+        self.assertEqual(self.usernames(response), ["carol"])
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        User.objects.create(username="dave")
+        with mock.patch.object(db_router, "measure_lag", side_effect=DatabaseError):
+            response = self.client.get("/users/")
+        self.assertEqual(self.usernames(response), ["dave"])
+
+    def test_router(self):
+        router = db_router.PrimaryReplicaRouter()
+
+        def route():
+            return router.db_for_read(User)
+
+        # Fresh contexts: nothing has been written in them yet.
+        self.assertEqual(contextvars.Context().run(route), "replica1")
+        with transaction.atomic():
+            self.assertEqual(contextvars.Context().run(route), "default")
+
+        def write_then_read():
+            self.assertEqual(router.db_for_write(User), "default")
+            return route()
+
+        self.assertEqual(contextvars.Context().run(write_then_read), "default")
+        self.assertFalse(router.allow_migrate("replica1", "auth"))
+        self.assertTrue(router.allow_migrate("default", "auth"))
+
+
+class HealthTest(TestCase):
+    def test_ok(self):
+        response = self.client.get("/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"status": "ok"})
+
+    def test_database_unavailable(self):
+        with mock.patch.object(views.connection, "cursor", side_effect=DatabaseError):
+            response = self.client.get("/health/")
+        self.assertEqual(response.status_code, 503)
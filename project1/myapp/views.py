@@ -1,6 +1,19 @@
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
 def home(request):
     # return HttpResponse("Hello, this is the home page!")
     return render(request, "myapp/home.html")
+
+
+def health(request):
+    """Check that a database connection can be obtained and used."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except DatabaseError:
+        return JsonResponse({"status": "unavailable"}, status=503)
+    return JsonResponse({"status": "ok"})
@@ -83,6 +83,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # A file, so that the worker processes of seed_firstapp can reach the
+        # test database.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -0,0 +1,97 @@
+import os
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from firstapp import seeding
+
+
+class Command(BaseCommand):
+    help = "Generate fake topics, webpages and access records in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--topics", type=int, default=5, help="Topics to create (default: 5)."
+        )
+        parser.add_argument(
+            "--webpages",
+            type=int,
+            default=100,
+            help="Webpages to create (default: 100).",
+        )
+        parser.add_argument(
+            "--records",
+            type=int,
+            default=1000,
+            help="Access records to create (default: 1000).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes generating and inserting rows (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=seeding.BATCH_SIZE,
+            help=f"Rows per bulk insert (default: {seeding.BATCH_SIZE}).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Faker seed; the same seed and batch size give the same rows.",
+        )
+        parser.add_argument(
+            "--existing",
+            choices=["skip", "truncate"],
+            default="skip",
+            help=(
+                "Leave tables that already have rows alone (skip, the default) "
+                "or empty all three tables first (truncate)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        for option in ("topics", "webpages", "records"):
+            if options[option] < 0:
+                raise CommandError(f"--{option} cannot be negative.")
+        if options["workers"] <= 0 or options["batch_size"] <= 0:
+            raise CommandError("--workers and --batch-size must be positive.")
+
+        def report(name, inserted, seconds):
+            if options["verbosity"] > 0 and seconds is None:
+                self.stdout.write(
+                    f"{name}: skipped, the table already has rows "
+                    "(use --existing truncate to replace them)"
+                )
+            elif options["verbosity"] > 0:
+                rate = inserted / seconds if seconds else 0
+                self.stdout.write(
+                    f"{name}: {inserted} rows in {seconds:.2f}s ({rate:,.0f} rows/s)"
+                )
+
+        seed = options["seed"]
+        if seed is None:
+            seed = random.randrange(2**32)
+        try:
+            inserted = seeding.seed(
+                {
+                    "topics": options["topics"],
+                    "webpages": options["webpages"],
+                    "records": options["records"],
+                },
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+                seed=seed,
+                existing=options["existing"],
+                report=report,
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Inserted {sum(inserted.values())} rows (seed {seed})."
+                )
+            )
@@ -0,0 +1,184 @@
+"""
+Bulk generation of Topic, Webpage and AcessRecord rows for load testing.
+
+Rows are made with Faker in ranges of ``batch_size`` indexes, each range
+seeded from ``(seed, model, start)`` so the same seed and batch size produce
+the same rows however many workers share the work. Every range is written with
+a single ``bulk_create(ignore_conflicts=True)``; names and URLs carry their
+index, so they are unique within a run, and a topic or webpage that clashes
+with an existing name or URL is dropped instead of failing the batch.
+
+Access records have no unique column, so nothing stops a second run from
+inserting them again. Tables that already hold rows are therefore left alone
+unless ``existing="truncate"`` empties all three first.
+
+Worker processes are started with ``spawn`` and set Django up themselves,
+which is why models are imported inside the functions here. They are pointed
+at the parent's database, which may not be the one in the settings (tests).
+"""
+
+import datetime
+import functools
+import multiprocessing
+import random
+import time
+
+import django
+from faker import Faker
+
+TOPICS = ["Search", "Social", "Marketplace", "News", "Games"]
+BATCH_SIZE = 1000
+VOCABULARY_SIZE = 1000
+
+# Per-process state set by _init_worker() and _insert().
+_fake = None
+_fk_ids = None
+_seed = None
+_today = None
+
+
+def _init_worker(fk_ids, database=None):
+    global _fake, _fk_ids, _today
+    if database is not None:
+        django.setup()
+        from django.db import DEFAULT_DB_ALIAS, connections
+
+        connections[DEFAULT_DB_ALIAS].settings_dict["NAME"] = database
+    _fake = Faker()
+    _today = datetime.date.today()
+    _fk_ids = fk_ids
+
+
+@functools.lru_cache(maxsize=1)
+def _vocabulary(seed):
+    """Company names and site URLs drawn once per seed and process."""
+    # Faker's company() and url() cost about half a millisecond each, more
+    # than inserting the row; the index appended to each value keeps it unique.
+    fake = Faker()
+    fake.seed_instance(seed)
+    return (
+        [fake.company() for _ in range(VOCABULARY_SIZE)],
+        [fake.url() for _ in range(VOCABULARY_SIZE)],
+    )
+
+
+def _topic(model, index):
+    name = TOPICS[index] if index < len(TOPICS) else f"{_fake.word().title()} {index}"
+    return model(top_name=name)
+
+
+def _webpage(model, index):
+    companies, urls = _vocabulary(_seed)
+    return model(
+        topic_id=_fake.random.choice(_fk_ids),
+        name=f"{_fake.random.choice(companies)} {index}",
+        url=f"{_fake.random.choice(urls)}{index}/",
+    )
+
+
+def _access_record(model, index):
+    return model(
+        name_id=_fake.random.choice(_fk_ids),
+        # Same range as date_between(start_date="-5y"), at a tenth of the cost.
+        date=_today - datetime.timedelta(days=_fake.random.randrange(5 * 365)),
+    )
+
+
+def _phases():
+    from firstapp.models import AcessRecord, Topic, Webpage
+
+    # (option name, model, model whose pks the rows point to, row factory)
+    return [
+        ("topics", Topic, None, _topic),
+        ("webpages", Webpage, Topic, _webpage),
+        ("records", AcessRecord, Webpage, _access_record),
+    ]
+
+
+def _insert(task):
+    """Generate and insert rows ``start`` to ``stop``; return how many were sent."""
+    global _seed
+    name, _seed, start, stop = task
+    _, model, _, factory = next(phase for phase in _phases() if phase[0] == name)
+    _fake.seed_instance(f"{_seed}:{name}:{start}")
+    model.objects.bulk_create(
+        [factory(model, index) for index in range(start, stop)],
+        ignore_conflicts=True,
+    )
+    return stop - start
+
+
+def _truncate(models):
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    # What the flush command runs: TRUNCATE on PostgreSQL, DELETE on SQLite,
+    # without loading millions of rows into a deletion collector.
+    tables = [model._meta.db_table for model in models]
+    connection.ops.execute_sql_flush(
+        connection.ops.sql_flush(no_style(), tables, reset_sequences=True)
+    )
+
+
+def seed(
+    counts,
+    workers=1,
+    batch_size=BATCH_SIZE,
+    seed=None,
+    existing="skip",
+    report=None,
+):
+    """
+    Insert ``counts["topics"]``, ``counts["webpages"]`` and ``counts["records"]``
+    rows, in that order.
+
+    With ``existing="skip"`` a table that already holds rows is not added to;
+    with ``existing="truncate"`` all three tables are emptied first.
+    ``report(name, inserted, seconds)`` is called after each phase, with
+    ``seconds=None`` for a skipped one; returns ``{name: rows inserted}``.
+    """
+    from django.db import DEFAULT_DB_ALIAS, connections
+
+    if seed is None:
+        seed = random.randrange(2**32)
+    phases = _phases()
+    if existing == "truncate":
+        _truncate([model for _, model, _, _ in phases])
+    results = {}
+    for name, model, fk_model, _ in phases:
+        count = counts.get(name, 0)
+        if not count:
+            continue
+        if existing == "skip" and model.objects.exists():
+            results[name] = 0
+            if report is not None:
+                report(name, 0, None)
+            continue
+        fk_ids = None
+        if fk_model is not None:
+            fk_ids = list(fk_model.objects.values_list("pk", flat=True))
+            if not fk_ids:
+                raise ValueError(f"No {fk_model._meta.verbose_name_plural} to use.")
+        tasks = [
+            (name, seed, start, min(start + batch_size, count))
+            for start in range(0, count, batch_size)
+        ]
+        before = model.objects.count()
+        started = time.perf_counter()
+        if workers > 1:
+            database = connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]
+            # Children open their own connections; don't share this one.
+            connections.close_all()
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(workers, _init_worker, (fk_ids, database)) as pool:
+                for _ in pool.imap_unordered(_insert, tasks):
+                    pass
+        else:
+            _init_worker(fk_ids)
+            for task in tasks:
+                _insert(task)
+        elapsed = time.perf_counter() - started
+        results[name] = model.objects.count() - before
+        if report is not None:
+            report(name, results[name], elapsed)
+    return results
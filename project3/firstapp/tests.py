@@ -1 +1,78 @@
-# Create your tests here.
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+
+from firstapp import seeding
+from firstapp.models import AcessRecord, Topic, Webpage
+
+
+def seed(**options):
+    options = {"workers": 1, "seed": 1, "stdout": StringIO(), **options}
+    call_command("seed_firstapp", **options)
+    return options["stdout"].getvalue()
+
+
+class SeedFirstappTest(TestCase):
+    def seed(self, **options):
+        return seed(**options)
+
+    def counts(self):
+        return [
+            Topic.objects.count(),
+            Webpage.objects.count(),
+            AcessRecord.objects.count(),
+        ]
+
+    def test_seed(self):
+        output = self.seed(topics=8, webpages=30, records=50, batch_size=7)
+        self.assertEqual(Topic.objects.count(), 8)
+        self.assertEqual(Webpage.objects.count(), 30)
+        self.assertEqual(AcessRecord.objects.count(), 50)
+        self.assertIn("rows/s", output)
+        self.assertTrue(
+            set(seeding.TOPICS) <= set(Topic.objects.values_list("top_name", flat=True))
+        )
+
+    def test_batches_per_phase(self):
+        # Per phase: whether the table has rows, a count before and after, the
+        # primary keys the rows point to, and one INSERT per batch.
+        with self.assertNumQueries((3 + 1) + (3 + 1 + 4) + (3 + 1 + 4)):
+            self.seed(topics=5, webpages=20, records=20, batch_size=5)
+
+    def test_rerun_skips_tables_with_rows(self):
+        self.seed(topics=5, webpages=20, records=30)
+        output = self.seed(topics=5, webpages=20, records=30)
+        self.assertEqual(self.counts(), [5, 20, 30])
+        self.assertIn("records: skipped", output)
+        # Empty tables are still filled, using the rows already there.
+        AcessRecord.objects.all().delete()
+        self.seed(topics=5, webpages=20, records=30, seed=2)
+        self.assertEqual(self.counts(), [5, 20, 30])
+
+    def test_truncate(self):
+        self.seed(topics=5, webpages=20, records=30)
+        names = set(Webpage.objects.values_list("name", flat=True))
+        self.seed(topics=5, webpages=10, records=40, existing="truncate")
+        self.assertEqual(self.counts(), [5, 10, 40])
+        # Same seed: the old rows were removed, not kept alongside the new.
+        self.assertLess(set(Webpage.objects.values_list("name", flat=True)), names)
+
+    def test_requires_related_rows(self):
+        with self.assertRaisesMessage(CommandError, "No topics"):
+            self.seed(topics=0, webpages=10, records=0)
+
+
+class SeedFirstappWorkersTest(TransactionTestCase):
+    def test_workers(self):
+        # Committed rows only: the workers are separate processes.
+        output = seed(topics=5, webpages=40, records=60, workers=2, batch_size=7)
+        self.assertIn("rows/s", output)
+        self.assertEqual(Topic.objects.count(), 5)
+        self.assertEqual(Webpage.objects.count(), 40)
+        self.assertEqual(AcessRecord.objects.count(), 60)
+        names = set(Webpage.objects.values_list("name", flat=True))
+
+        # The rows depend on the seed and batch size, not on the workers.
+        seed(topics=5, webpages=40, records=0, batch_size=7, existing="truncate")
+        self.assertEqual(set(Webpage.objects.values_list("name", flat=True)), names)
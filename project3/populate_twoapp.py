@@ -3,25 +3,28 @@ import os
 import django
 from faker import Faker
 
-from twoapp.models import User
-
-# Set up Django environment
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project0.settings")
+# Set up Django environment before anything touches the models.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Project3.settings")
 django.setup()
 
+from twoapp import importing  # noqa: E402
+
 fakegen = Faker()
 
 
+def fake_user():
+    fake_name = fakegen.name().split()
+    return {
+        "first_name": fake_name[0],
+        "last_name": fake_name[1],
+        "email": fakegen.email(),
+    }
+
+
 def populate(N=5):
-    for entry in range(N):
-        fake_name = fakegen.name().split()
-        fake_first_name = fake_name[0]
-        fake_last_name = fake_name[1]
-        fake_email = fakegen.email()
-
-        User.objects.get_or_create(
-            first_name=fake_first_name, last_name=fake_last_name, email=fake_email
-        )[0]
+    rows = enumerate((fake_user() for entry in range(N)), start=1)
+    result = importing.import_rows(rows)
+    print(f"Created {result['created']} users, rejected {len(result['rejected'])}.")
 
 
 if __name__ == "__main__":
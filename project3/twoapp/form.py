@@ -37,15 +37,11 @@ class NewUserForm(forms.ModelForm):
             "email": {
                 "required": "Email address is required",
                 "invalid": "Please enter a valid email address",
+                # Checked by validate_unique() against the unique column.
+                "unique": "This email address is already in use.",
             },
         }
 
-    def clean_email(self):
-        email = self.cleaned_data.get("email")
-        if email and User.objects.filter(email=email).exists():
-            raise forms.ValidationError("This email address is already in use.")
-        return email
-
     def clean(self):
         cleaned_data = super().clean()
         first_name = cleaned_data.get("first_name")
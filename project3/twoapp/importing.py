@@ -0,0 +1,152 @@
+"""
+Bulk import of ``User`` rows from CSV or NDJSON.
+
+Input is read line by line and handled ``chunk_size`` rows at a time, so an
+import of any size holds one chunk in memory. Each row goes through the same
+validation as ``NewUserForm`` except the per-row uniqueness query; instead the
+emails of a whole chunk are checked against the table with one ``IN`` query,
+and the rows that survive are written with one ``bulk_create``.
+
+Rows that fail are reported with their line number and errors and the import
+goes on. Chunks are committed one by one, so later chunks see the emails of
+earlier ones. If someone else inserts one of the emails between the check and
+the insert, the unique column fails the insert; its savepoint is rolled back,
+the rows whose email is now taken are rejected as duplicates and the rest are
+inserted again, so the created count only includes rows actually written.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from twoapp.form import NewUserForm
+from twoapp.models import User
+
+CHUNK_SIZE = 1000
+
+IN_USE_MESSAGE = NewUserForm._meta.error_messages["email"]["unique"]
+
+
+class ImportUserForm(NewUserForm):
+    def _get_validation_exclusions(self):
+        # Neither validate_unique() nor the model's constraints query the
+        # email; import_users() checks the whole chunk at once.
+        return super()._get_validation_exclusions() | {"email"}
+
+
+def read_csv(lines):
+    """Yield ``(line number, row)`` from CSV text with a header row."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(lines):
+    """Yield ``(line number, object)``, or an error message for bad lines."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, "Expected a JSON object."
+            continue
+        yield number, row
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson"}
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def _rejection(line, field, message, code):
+    # Same shape as form.errors.get_json_data().
+    return {"line": line, "errors": {field: [{"message": message, "code": code}]}}
+
+
+def _import_chunk(chunk):
+    """Insert the valid rows of ``chunk``; return ``(created, rejected)``."""
+    rejected = []
+    valid = {}
+    for line, row in chunk:
+        if isinstance(row, str):
+            rejected.append(_rejection(line, "__all__", row, "invalid"))
+            continue
+        form = ImportUserForm(row)
+        if not form.is_valid():
+            rejected.append({"line": line, "errors": form.errors.get_json_data()})
+            continue
+        email = form.cleaned_data["email"]
+        if email in valid:
+            message = f"Same email address as line {valid[email][0]}."
+            rejected.append(_rejection(line, "email", message, "unique"))
+            continue
+        valid[email] = (line, form.instance)
+
+    for email in _emails_in_use(valid):
+        line, _ = valid.pop(email)
+        rejected.append(_rejection(line, "email", IN_USE_MESSAGE, "unique"))
+    created = _insert(valid, rejected)
+    rejected.sort(key=lambda rejection: rejection["line"])
+    return created, rejected
+
+
+def _emails_in_use(emails):
+    return set(
+        User.objects.filter(email__in=list(emails)).values_list("email", flat=True)
+    )
+
+
+def _insert(valid, rejected):
+    """
+    Insert the users in ``valid`` (email -> (line, user)); reject those whose
+    email another writer took since the check. Return how many were inserted.
+    """
+    while valid:
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in valid.values()])
+            return len(valid)
+        except IntegrityError:
+            taken = _emails_in_use(valid)
+            if not taken:
+                raise
+            for email in taken:
+                line, _ = valid.pop(email)
+                rejected.append(_rejection(line, "email", IN_USE_MESSAGE, "unique"))
+            # Rolled back: drop any primary keys the failed insert assigned.
+            for _, user in valid.values():
+                user.pk = None
+    return 0
+
+
+def import_rows(rows, chunk_size=CHUNK_SIZE):
+    """
+    Import ``(line number, row)`` pairs, each row a dict of form data or an
+    error message.
+
+    Return ``{"created": count, "rejected": [{"line": n, "errors": {...}}]}``,
+    the errors keyed by field as in ``form.errors.get_json_data()``.
+    """
+    created = 0
+    rejected = []
+    for chunk in _chunks(rows, chunk_size):
+        chunk_created, chunk_rejected = _import_chunk(chunk)
+        created += chunk_created
+        rejected += chunk_rejected
+    return {"created": created, "rejected": rejected}
+
+
+def import_users(lines, format, chunk_size=CHUNK_SIZE):
+    """Import users from ``lines``, an iterable of text lines in ``format``."""
+    return import_rows(READERS[format](lines), chunk_size)
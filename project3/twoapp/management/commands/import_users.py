@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from twoapp import importing
+
+
+class Command(BaseCommand):
+    help = "Import users from a CSV or NDJSON file, skipping rows that fail."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for standard input.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(importing.READERS),
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=importing.CHUNK_SIZE,
+            help=f"Rows validated and inserted together "
+            f"(default: {importing.CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or Path(path).suffix.lstrip(".").lower()
+        if format not in importing.READERS:
+            raise CommandError("Pass --format for files without a .csv/.ndjson name.")
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be positive.")
+
+        if path == "-":
+            result = importing.import_users(sys.stdin, format, options["chunk_size"])
+        else:
+            # newline="" lets the CSV reader handle line breaks inside quotes.
+            with open(path, encoding="utf-8", newline="") as lines:
+                result = importing.import_users(lines, format, options["chunk_size"])
+
+        for rejection in result["rejected"]:
+            for field, errors in rejection["errors"].items():
+                for error in errors:
+                    self.stderr.write(
+                        f"line {rejection['line']}: {field}: {error['message']}"
+                    )
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Created {result['created']} users, "
+                    f"rejected {len(result['rejected'])} rows."
+                )
+            )
@@ -1 +1,159 @@
-# Create your tests here.
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from twoapp import importing
+from twoapp.form import NewUserForm
+from twoapp.models import User
+
+CSV = """first_name,last_name,email
+Ada,Lovelace,ada@example.com
+Alan,Turing,alan@example.com
+grace,Hopper,grace@example.com
+Linus,Torvalds,ada@example.com
+Existing,User,taken@example.com
+,Nobody,nobody@example.com
+"""
+
+
+class UserImportTest(TestCase):
+    def setUp(self):
+        User.objects.create(
+            first_name="Taken", last_name="User", email="taken@example.com"
+        )
+
+    def errors(self, result):
+        return {
+            rejection["line"]: {
+                field: [error["message"] for error in errors]
+                for field, errors in rejection["errors"].items()
+            }
+            for rejection in result["rejected"]
+        }
+
+    def test_import_csv(self):
+        result = importing.import_users(StringIO(CSV), "csv")
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            self.errors(result),
+            {
+                4: {"first_name": ["First name should start with a capital letter"]},
+                5: {"email": ["Same email address as line 2."]},
+                6: {"email": ["This email address is already in use."]},
+                7: {"first_name": ["First name is required"]},
+            },
+        )
+        codes = {
+            rejection["line"]: rejection["errors"]["email"][0]["code"]
+            for rejection in result["rejected"]
+            if "email" in rejection["errors"]
+        }
+        self.assertEqual(codes, {5: "unique", 6: "unique"})
+        self.assertEqual(
+            set(User.objects.values_list("email", flat=True)),
+            {"taken@example.com", "ada@example.com", "alan@example.com"},
+        )
+
+    def test_import_ndjson(self):
+        lines = [
+            '{"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com"}',
+            "",
+            "not json",
+            "[1, 2]",
+            '{"first_name": "Ada", "last_name": "King", "email": "ada@example.com"}',
+        ]
+        result = importing.import_users(lines, "ndjson", chunk_size=1)
+        self.assertEqual(result["created"], 1)
+        errors = self.errors(result)
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertTrue(errors[3]["__all__"][0].startswith("Invalid JSON"))
+        # Chunks are committed in turn, so a later chunk sees earlier emails.
+        self.assertEqual(
+            errors[5], {"email": ["This email address is already in use."]}
+        )
+
+    def test_one_query_per_chunk_for_emails(self):
+        rows = (f"User{i},Example,user{i}@example.com" for i in range(10))
+        lines = ["first_name,last_name,email", *rows]
+        # Per chunk of four: one IN query and one INSERT, in a savepoint here
+        # because the test runs inside a transaction.
+        with self.assertNumQueries(3 * (1 + 3)):
+            result = importing.import_users(lines, "csv", chunk_size=4)
+        self.assertEqual(result["created"], 10)
+
+    def test_import_form_does_not_query_emails(self):
+        data = {
+            "first_name": "Taken",
+            "last_name": "Again",
+            "email": "taken@example.com",
+        }
+        with self.assertNumQueries(0):
+            self.assertTrue(importing.ImportUserForm(data).is_valid())
+
+    def test_email_taken_during_import(self):
+        check = importing._emails_in_use
+        calls = []
+
+        def taken_after_check(emails):
+            # Another writer inserts taken@example.com after the chunk's check.
+            calls.append(emails)
+            return set() if len(calls) == 1 else check(emails)
+
+        with mock.patch.object(importing, "_emails_in_use", taken_after_check):
+            result = importing.import_users(StringIO(CSV), "csv")
+        self.assertEqual(result["created"], 2)
+        rejection = next(r for r in result["rejected"] if r["line"] == 6)
+        self.assertEqual(rejection["errors"]["email"][0]["code"], "unique")
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "users.csv"
+            path.write_text(CSV)
+            stdout, stderr = StringIO(), StringIO()
+            call_command("import_users", str(path), stdout=stdout, stderr=stderr)
+        self.assertIn("Created 2 users, rejected 4 rows.", stdout.getvalue())
+        self.assertIn(
+            "line 6: email: This email address is already in use.", stderr.getvalue()
+        )
+
+    def test_endpoint(self):
+        url = reverse("twoapp:user_import")
+        response = self.client.post(url, CSV, content_type="text/csv")
+        self.assertEqual(response.status_code, 403)
+
+        staff = AuthUser.objects.create_user("staff", password="secret")
+        staff.user_permissions.add(
+            Permission.objects.get(
+                codename="add_user", content_type__app_label="twoapp"
+            )
+        )
+        self.client.force_login(staff)
+        response = self.client.post(url, CSV, content_type="text/plain")
+        self.assertEqual(response.status_code, 415)
+        response = self.client.post(url, CSV, content_type="text/csv")
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)
+        self.assertEqual(result["created"], 2)
+        self.assertEqual([r["line"] for r in result["rejected"]], [4, 5, 6, 7])
+
+    def test_form_uses_the_unique_check_once(self):
+        data = {
+            "first_name": "Taken",
+            "last_name": "Again",
+            "email": "taken@example.com",
+        }
+        with self.assertNumQueries(1):
+            form = NewUserForm(data)
+            self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors["email"], ["This email address is already in use."]
+        )
@@ -8,4 +8,5 @@ urlpatterns = [
     path("index/", views.index, name="index"),
     path("user/", views.users, name="users"),
     path("form/", views.form, name="form"),
+    path("user/import/", views.user_import, name="user_import"),
 ]
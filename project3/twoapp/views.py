@@ -1,4 +1,9 @@
+from django.contrib.auth.decorators import permission_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from twoapp import importing
 from twoapp.models import User
 from twoapp.form import NewUserForm
 
@@ -29,3 +34,25 @@ def form(request):
         else:
             print("ERROR invalid FORM")
     return render(request, "twoapp/form.html", {"form": form})
+
+
+# Browsers can't send these content types cross-site without a CORS preflight,
+# which this site never grants, so the body can't be forged by another page.
+@csrf_exempt
+@require_POST
+@permission_required("twoapp.add_user", raise_exception=True)
+def user_import(request):
+    format = importing.CONTENT_TYPES.get(request.content_type)
+    if format is None:
+        return JsonResponse(
+            {"error": f"Send one of: {', '.join(importing.CONTENT_TYPES)}."},
+            status=415,
+        )
+    # Read the body line by line instead of loading it into memory.
+    encoding = request.encoding or "utf-8"
+    lines = (line.decode(encoding) for line in request)
+    try:
+        result = importing.import_users(lines, format)
+    except UnicodeDecodeError as e:
+        return JsonResponse({"error": f"Body is not {encoding}: {e}"}, status=400)
+    return JsonResponse(result)
@@ -0,0 +1,169 @@
+"""
+Compare concurrent-request throughput of the WSGI and ASGI deployments.
+
+Starts gunicorn three times on the local database -- sync workers serving the
+DRF views, uvicorn workers serving the same DRF views, and uvicorn workers
+serving the native async views -- and hits each with the same concurrent load:
+
+    python benchmarks/serving.py --requests 2000 --concurrency 50 --workers 3
+
+The response cache is disabled so every request reaches the database. Posts are
+seeded into ``db.sqlite3`` first if it holds fewer than ``--posts``. Requires
+``gunicorn``, ``uvicorn`` and ``uvicorn-worker``.
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+SETUPS = [
+    ("wsgi / sync views", "blog.wsgi:application", "sync", "/api/posts/"),
+    (
+        "asgi / sync views",
+        "blog.asgi:application",
+        "uvicorn_worker.UvicornWorker",
+        "/api/posts/",
+    ),
+    (
+        "asgi / async views",
+        "blog.asgi:application",
+        "uvicorn_worker.UvicornWorker",
+        "/api/async/posts/",
+    ),
+]
+
+
+def seed(posts):
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from blogapp.models import Comment, Post
+
+    call_command("migrate", verbosity=0)
+    missing = posts - Post.objects.count()
+    if missing <= 0:
+        return
+    author, _ = User.objects.get_or_create(username="benchmark")
+    created = Post.objects.bulk_create(
+        Post(title=f"Benchmark {i}", content="Lorem ipsum " * 50, author=author)
+        for i in range(missing)
+    )
+    Comment.objects.bulk_create(
+        Comment(post=post, author=author, text=f"Comment {i}")
+        for post in created
+        for i in range(3)
+    )
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health/live/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def run_client(port, path, count):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    errors = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        errors += response.status != 200
+    connection.close()
+    return latencies, errors
+
+
+def bench(app, worker_class, path, args, port):
+    env = dict(os.environ, BLOG_RESPONSE_CACHE_TIMEOUT="0")
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        app,
+        "--workers",
+        str(args.workers),
+        "--worker-class",
+        worker_class,
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+    ]
+    server = subprocess.Popen(command, cwd=PROJECT_DIR, env=env)
+    try:
+        wait_until_up(port)
+        run_client(port, path, 20)  # warm up every worker
+        per_client = args.requests // args.concurrency
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(
+                pool.map(
+                    lambda _: run_client(port, path, per_client),
+                    range(args.concurrency),
+                )
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for result, _ in results for latency in result)
+    errors = sum(errors for _, errors in results)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": quantiles[49] * 1000,
+        "p95": quantiles[94] * 1000,
+        "p99": quantiles[98] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    seed(args.posts)
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{args.workers} workers"
+    )
+    print(f"{'setup':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  errors")
+    for offset, (name, app, worker_class, path) in enumerate(SETUPS):
+        result = bench(app, worker_class, path, args, args.port + offset)
+        print(
+            f"{name:<22}{result['rps']:>9.1f}{result['p50']:>9.1f}"
+            f"{result['p95']:>9.1f}{result['p99']:>9.1f}  {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
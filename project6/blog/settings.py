@@ -45,13 +45,46 @@ INSTALLED_APPS = [
     "corsheaders",
 ]
 
+# JWT users are resolved through the cache (see blogapp.authentication), or
+# built from the token claims alone when BLOG_AUTH_STATELESS is set.
+BLOG_AUTH_STATELESS = os.environ.get("BLOG_AUTH_STATELESS", "") == "1"
+BLOG_AUTH_CACHE_ALIAS = "api"
+BLOG_AUTH_CACHE_TIMEOUT = 300
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        (
+            "blogapp.authentication.StatelessJWTAuthentication"
+            if BLOG_AUTH_STATELESS
+            else "blogapp.authentication.CachedJWTAuthentication"
+        ),
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
+    # Token buckets for the views that set ``throttle_scope`` (see
+    # blogapp.throttling); rates are "<scope>.user" and "<scope>.ip".
+    "DEFAULT_THROTTLE_CLASSES": (
+        "blogapp.throttling.IPTokenBucketThrottle",
+        "blogapp.throttling.UserTokenBucketThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "like.user": os.environ.get("BLOG_THROTTLE_LIKE_USER", "60/min"),
+        "like.ip": os.environ.get("BLOG_THROTTLE_LIKE_IP", "300/min"),
+        "comment.user": os.environ.get("BLOG_THROTTLE_COMMENT_USER", "10/min"),
+        "comment.ip": os.environ.get("BLOG_THROTTLE_COMMENT_IP", "60/min"),
+        # Per request of up to 1000 comments, for migrations and imports.
+        "comment_bulk.user": os.environ.get("BLOG_THROTTLE_COMMENT_BULK_USER", "6/min"),
+        "comment_bulk.ip": os.environ.get("BLOG_THROTTLE_COMMENT_BULK_IP", "30/min"),
+    },
+}
+
+# Buckets shared by every worker; each process also keeps its own to refuse
+# floods without a cache round trip.
+BLOG_THROTTLE_CACHE_ALIAS = "api"
+
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "blogapp.serializers.BlogTokenObtainPairSerializer",
 }
 
 MIDDLEWARE = [
@@ -85,6 +118,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "blog.wsgi.application"
+ASGI_APPLICATION = "blog.asgi.application"
 
 
 # Database
@@ -94,10 +128,68 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Use a file rather than shared-cache memory so that tests running
+        # several threads get SQLite's normal locking and busy timeout.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The "api" cache holds rendered-to-data API responses (see blogapp.cache). It
+# defaults to per-process local memory; point DJANGO_API_CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache (LOCATION is a directory)
+# or django.core.cache.backends.redis.RedisCache (LOCATION is a redis:// URL)
+# to share it between gunicorn workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "api": {
+        "BACKEND": os.environ.get(
+            "DJANGO_API_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("DJANGO_API_CACHE_LOCATION", "blog-api"),
+    },
+}
+
+BLOG_RESPONSE_CACHE_ALIAS = "api"
+BLOG_RESPONSE_CACHE_TIMEOUT = int(os.environ.get("BLOG_RESPONSE_CACHE_TIMEOUT", 60))
+
+# Progress of background jobs such as "delete all posts" (see blogapp.deletion)
+# is published in this cache so that every worker can report it.
+BLOG_JOB_CACHE_ALIAS = "api"
+BLOG_DELETE_JOBS_ASYNC = True
+
+# Request metrics served at /metrics (see blogapp.metrics). With several worker
+# processes, point BLOG_METRICS_DIR at a directory they all share so that the
+# numbers are summed across them.
+BLOG_METRICS_DIR = os.environ.get("BLOG_METRICS_DIR") or None
+BLOG_METRICS_FLUSH_INTERVAL = float(os.environ.get("BLOG_METRICS_FLUSH_INTERVAL", 1))
+# Client networks allowed to scrape /metrics, separated by spaces.
+BLOG_METRICS_ALLOWED_NETWORKS = os.environ.get(
+    "BLOG_METRICS_ALLOWED_NETWORKS", "127.0.0.0/8 ::1/128"
+).split()
+
+# Liveness/readiness paths served by blogapp.health.HealthCheckMiddleware.
+BLOG_HEALTH_LIVE_PATH = "/health/live/"
+BLOG_HEALTH_READY_PATH = "/health/ready/"
+BLOG_HEALTH_CACHE_SECONDS = 5
+BLOG_HEALTH_MIN_FREE_BYTES = 50 * 1024 * 1024
+
+# Live comment streams (see blogapp.events). The local backend only reaches
+# streams served by the same process, so it needs a single worker; run
+# several workers with blogapp.events.RedisBackend instead.
+BLOG_EVENTS_BACKEND = os.environ.get(
+    "BLOG_EVENTS_BACKEND", "blogapp.events.LocalBackend"
+)
+BLOG_EVENTS_REDIS_URL = os.environ.get("BLOG_EVENTS_REDIS_URL", "redis://redis:6379/0")
+BLOG_EVENTS_KEEPALIVE_SECONDS = 15
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -155,8 +247,14 @@ os.makedirs(MEDIA_ROOT, exist_ok=True)
 
 # Add whitenoise for serving static files in production
 MIDDLEWARE = [
+    # Answers /health/live/ and /health/ready/ before anything else runs.
+    "blogapp.health.HealthCheckMiddleware",
+    # Next, so that its latency covers the rest of the chain.
+    "blogapp.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise's middleware, made async-capable so that the two above run
+    # on the event loop under ASGI.
+    "blogapp.static_files.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -21,6 +21,7 @@ Only authenticated users should be able to create, update, or delete posts and c
 
 from django.contrib import admin
 from django.urls import path, include
+from blogapp.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -28,6 +29,7 @@ from rest_framework_simplejwt.views import (
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     # Expose `blogapp` both at root (/) and under /api/ so the `home` view
     # (which is mapped to the empty path in `blogapp.urls`) is reachable
     # at http://<host>/ as well as at /api/.
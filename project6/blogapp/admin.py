@@ -1,23 +1,228 @@
+from functools import partial
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
+from .cache import response_cache
 from .models import Post, Comment
+from .pagination import EstimatedCountPaginator
+from . import search
+
+
+class FullTextSearchMixin:
+    """
+    Answer the changelist search box from the full-text index for the
+    ``full_text_fields``, and with ``icontains`` lookups for the other
+    ``search_fields``; a row matching either is shown. Autocomplete widgets
+    keep the admin's own search, since they look objects up by the start of a
+    word as it is typed and the index only matches whole words.
+    """
+
+    full_text_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if request.path.endswith("/autocomplete/"):
+            return super().get_search_results(request, queryset, search_term)
+        if not search_term.strip():
+            return queryset, False
+        results = search.filter_queryset(queryset, search_term)
+        lookups = [
+            field
+            for field in self.get_search_fields(request)
+            if field not in self.full_text_fields
+        ]
+        if not lookups:
+            return results, False
+        terms = Q()
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            terms &= Q.create(
+                [(f"{field}__icontains", bit) for field in lookups],
+                connector=Q.OR,
+            )
+        may_have_duplicates = any(
+            lookup_spawns_duplicates(self.opts, field) for field in lookups
+        )
+        return results | queryset.filter(terms), may_have_duplicates
+
+
+class AutocompleteListFilter(admin.SimpleListFilter):
+    """
+    Filter on a foreign key through the admin's autocomplete search instead of
+    listing every related object in the sidebar. Nothing is queried unless a
+    value is selected, and then only that object is loaded.
+    """
+
+    template = "admin/blogapp/autocomplete_filter.html"
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.model = model
+        self.model_admin = model_admin
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            return queryset.filter(**{f"{self.field_name}_id": int(self.value())})
+        except ValueError as e:
+            raise IncorrectLookupParameters(e)
+
+    def widget(self):
+        field = self.model._meta.get_field(self.field_name)
+        choices = forms.ModelChoiceField(
+            field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(
+                field,
+                self.model_admin.admin_site,
+                attrs={"data-list-filter": self.parameter_name},
+            ),
+            required=False,
+        )
+        return choices.widget.render(self.parameter_name, self.value())
+
+    @classmethod
+    def media(cls, model, admin_site):
+        field = model._meta.get_field(cls.field_name)
+        # The same jQuery file as the admin's own media, so it loads once.
+        extra = "" if settings.DEBUG else ".min"
+        return AutocompleteSelect(field, admin_site).media + forms.Media(
+            js=[
+                f"admin/js/vendor/jquery/jquery{extra}.js",
+                "admin/js/jquery.init.js",
+                "blogapp/admin_list_filter.js",
+            ]
+        )
+
+
+class AuthorFilter(AutocompleteListFilter):
+    title = "author"
+    field_name = "author"
+    # Same parameter as the default related-field filter, so old links work.
+    parameter_name = "author__id__exact"
+
+
+class ChangeListMixin:
+    """
+    Changelists that run a fixed number of queries however many rows they
+    show: related objects are joined, counts are read from the post counters,
+    large tables are counted from statistics, and the author filter is an
+    autocomplete box.
+    """
+
+    paginator = EstimatedCountPaginator
+    # Would add a COUNT(*) of the whole table to every filtered page.
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AuthorFilter.media(self.model, self.admin_site)
+
+
+class ResponseCacheMixin:
+    """
+    Invalidate the API's cached responses of the posts an admin save, delete
+    or bulk delete touches, as the API's own write paths do. Not before the
+    commit: a request in between would cache the old rows again.
+    """
+
+    # The attribute holding the id of the post a row belongs to.
+    post_id_field = "id"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.invalidate_posts([getattr(obj, self.post_id_field)])
+
+    def delete_model(self, request, obj):
+        post_id = getattr(obj, self.post_id_field)
+        super().delete_model(request, obj)
+        self.invalidate_posts([post_id])
+
+    def delete_queryset(self, request, queryset):
+        post_ids = set(queryset.values_list(self.post_id_field, flat=True))
+        super().delete_queryset(request, queryset)
+        self.invalidate_posts(post_ids)
+
+    def invalidate_posts(self, post_ids):
+        transaction.on_commit(partial(response_cache.invalidate_posts, post_ids))
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
-    list_display = ("title", "author", "published_date", "get_likes_count")
-    list_filter = ("published_date", "author")
+class PostAdmin(
+    ResponseCacheMixin, FullTextSearchMixin, ChangeListMixin, admin.ModelAdmin
+):
+    list_display = (
+        "title",
+        "author",
+        "published_date",
+        "get_likes_count",
+        "get_comments_count",
+    )
+    list_filter = ("published_date", AuthorFilter)
+    list_select_related = ("author",)
+    autocomplete_fields = ("author",)
     search_fields = ("title", "content")
-    readonly_fields = ("published_date",)
+    full_text_fields = ("title", "content")
+    readonly_fields = ("published_date", "likes_count", "comments_count")
+    # Likes are toggled by readers; editing them here would skip likes_count.
+    exclude = ("likes",)
+    # Matches the post_published_id_idx / post_author_published_id_idx indexes.
+    ordering = ("-published_date", "-id")
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
 
     get_likes_count.short_description = "Likes"
+    get_likes_count.admin_order_field = "likes_count"
+
+    def get_comments_count(self, obj):
+        return obj.comments_count
+
+    get_comments_count.short_description = "Comments"
+    get_comments_count.admin_order_field = "comments_count"
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(
+    ResponseCacheMixin, FullTextSearchMixin, ChangeListMixin, admin.ModelAdmin
+):
     list_display = ("text", "author", "post", "created_date")
-    list_filter = ("created_date", "author")
+    list_filter = ("created_date", AuthorFilter)
+    list_select_related = ("author", "post")
+    autocomplete_fields = ("author", "post")
     search_fields = ("text", "author__username", "post__title")
+    full_text_fields = ("text",)
     readonly_fields = ("created_date",)
+    # Matches the comment_created_id_idx / comment_author_created_id_idx indexes.
+    ordering = ("-created_date", "-id")
+    post_id_field = "post_id"
+
+    def get_queryset(self, request):
+        # Comment.__str__ (delete confirmations, history) and the changelist
+        # both show the author and the post title; the post body is not needed.
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("author", "post")
+            .defer("post__content")
+        )
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "post" in form.changed_data:
+            # The comment also left the post it was on.
+            self.invalidate_posts([form.initial["post"]])
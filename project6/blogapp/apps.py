@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlogappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blogapp"
+
+    def ready(self):
+        # Connects the signals that drop cached users when they change.
+        from . import authentication  # noqa: F401
@@ -0,0 +1,169 @@
+"""
+Native async variants of the public read endpoints.
+
+DRF views are synchronous, so under an ASGI server every request to them runs
+in a worker thread. These views await Django's async ORM instead and reuse the
+DRF serializers only to shape data that is already loaded, so the response
+bodies match their synchronous counterparts:
+
+* ``async/posts/``                   -- ``PostListCreate`` (GET)
+* ``async/posts/<pk>/``              -- ``PostRetrieveUpdateDestroy`` (GET)
+* ``async/posts/<post_pk>/comments/`` -- ``CommentListCreate`` (GET)
+* ``async/health/``                  -- ``HealthCheckView``
+
+``posts/<post_pk>/comments/stream/`` has no synchronous counterpart: it is a
+Server-Sent Events stream of the post's comment events (see ``blogapp.events``)
+and only works under ASGI, where an idle stream costs a coroutine rather than
+a worker.
+
+Any lazy query left in the serialization path would raise
+``SynchronousOnlyOperation`` rather than block the event loop.
+"""
+
+import asyncio
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import events
+from .models import Comment, Post
+from .pagination import PostPagination
+from .serializers import CommentSerializer, PostSerializer
+
+
+def _page_size(request):
+    try:
+        page_size = int(request.GET[PostPagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return PostPagination.page_size
+    if page_size <= 0:
+        return PostPagination.page_size
+    return min(page_size, PostPagination.max_page_size)
+
+
+def _not_found(detail):
+    # Same body as DRF's NotFound, rather than Django's HTML 404 page.
+    return JsonResponse({"detail": detail}, status=404)
+
+
+def _page_link(request, number):
+    url = request.build_absolute_uri()
+    if number == 1:
+        return remove_query_param(url, PostPagination.page_query_param)
+    return replace_query_param(url, PostPagination.page_query_param, number)
+
+
+@require_GET
+async def post_list(request):
+    """Page-number paginated post list, as returned by ``PostListCreate``."""
+    page_size = _page_size(request)
+    try:
+        number = int(request.GET.get(PostPagination.page_query_param, 1))
+    except ValueError:
+        return _not_found("Invalid page.")
+
+    queryset = Post.objects.with_details().order_by("-published_date", "-id")
+    count = await queryset.acount()
+    pages = max(1, -(-count // page_size))
+    if not 1 <= number <= pages:
+        return _not_found("Invalid page.")
+
+    offset = (number - 1) * page_size
+    posts = [post async for post in queryset[offset : offset + page_size]]
+    context = {"request": request}
+    return JsonResponse(
+        {
+            "count": count,
+            "next": _page_link(request, number + 1) if number < pages else None,
+            "previous": _page_link(request, number - 1) if number > 1 else None,
+            "results": PostSerializer(posts, many=True, context=context).data,
+        }
+    )
+
+
+@require_GET
+async def post_detail(request, pk):
+    try:
+        post = await Post.objects.with_details().aget(pk=pk)
+    except Post.DoesNotExist:
+        return _not_found("No Post matches the given query.")
+    return JsonResponse(PostSerializer(post, context={"request": request}).data)
+
+
+@require_GET
+async def comment_list(request, post_pk):
+    queryset = (
+        Comment.objects.filter(post_id=post_pk)
+        .select_related("author")
+        .order_by("-created_date", "-id")
+    )
+    comments = [comment async for comment in queryset]
+    data = CommentSerializer(comments, many=True, context={"request": request}).data
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def health(request):
+    return JsonResponse(
+        {
+            "status": "ok",
+            "timestamp": timezone.now().isoformat(),
+            "service": "django-blog-app",
+            "version": "1.0.0",
+        }
+    )
+
+
+async def _comment_events(post_id, last_event_id):
+    subscription, backlog = events.hub.subscribe(post_id, last_event_id)
+    keepalive = getattr(settings, "BLOG_EVENTS_KEEPALIVE_SECONDS", 15)
+    try:
+        yield "retry: 3000\n\n"
+        if backlog is None:
+            yield "event: reset\ndata: {}\n\n"
+        else:
+            for event in backlog:
+                yield event.encode()
+        while not subscription.overflowed:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection.
+                yield ": keepalive\n\n"
+                continue
+            yield event.encode()
+        yield "event: reset\ndata: {}\n\n"
+    finally:
+        events.hub.unsubscribe(subscription)
+
+
+async def comment_stream(request, post_pk):
+    """
+    ``text/event-stream`` of ``comment-created`` and ``comment-deleted`` events
+    for one post. Reconnecting clients send ``Last-Event-ID`` (or
+    ``?last_event_id=``) and get the events they missed, or a ``reset`` event if
+    those are gone.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": "Method not allowed."}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Comment streams need the ASGI server."}, status=501
+        )
+    if not await Post.objects.filter(pk=post_pk).aexists():
+        return _not_found("No Post matches the given query.")
+
+    events.get_backend().listen()
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+        "last_event_id"
+    )
+    response = StreamingHttpResponse(
+        _comment_events(post_pk, last_event_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,134 @@
+"""
+JWT authentication without a ``User`` query on every request.
+
+``CachedJWTAuthentication`` keeps the users it resolves in the cache named by
+``BLOG_AUTH_CACHE_ALIAS`` for ``BLOG_AUTH_CACHE_TIMEOUT`` seconds. Entries are
+keyed on the user id, so every token of a user shares one entry, and they are
+dropped once a transaction that saves or deletes the user commits, which
+covers deactivation and password changes. Updates that bypass ``save()``
+(``QuerySet.update()``, raw SQL) are only picked up once the entry expires.
+
+The password hash never goes into the cache: an entry holds the user's other
+fields and the digest of the hash that revocable tokens are checked against.
+Users built from an entry have ``password`` deferred, so saving one cannot
+overwrite it, and reading it costs a query.
+
+``StatelessJWTAuthentication`` skips the database and the cache altogether and
+builds an unsaved ``User`` from the token claims. It is selected by
+``BLOG_AUTH_STATELESS``; deactivating a user or changing their password then
+only takes effect when their access token expires.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _cache():
+    return caches[getattr(settings, "BLOG_AUTH_CACHE_ALIAS", "default")]
+
+
+def user_cache_key(user_id):
+    return f"blog:auth:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    """Forget the cached user ``user_id``, if any."""
+    _cache().delete(user_cache_key(user_id))
+
+
+def _to_entry(user):
+    fields = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.name != "password"
+    }
+    return {
+        "db": user._state.db,
+        "fields": fields,
+        "password_hash": get_md5_hash_password(user.password),
+    }
+
+
+def _from_entry(entry):
+    fields = entry["fields"]
+    return get_user_model().from_db(entry["db"], list(fields), list(fields.values()))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that resolves users through the cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        entry = _cache().get(key)
+        if entry is None:
+            # Raises for unknown and inactive users, which are never cached.
+            user = super().get_user(validated_token)
+            _cache().set(
+                key,
+                _to_entry(user),
+                getattr(settings, "BLOG_AUTH_CACHE_TIMEOUT", 300),
+            )
+            return user
+        user = _from_entry(entry)
+
+        # The same checks the parent runs after its lookup.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+            != entry["password_hash"]
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that trusts the token claims instead of looking the
+    user up. The returned user is an unsaved ``User`` carrying the id (so it
+    can be assigned to foreign keys and compared with loaded users) and the
+    ``username``, ``is_staff`` and ``is_superuser`` claims added by
+    ``BlogTokenObtainPairSerializer``.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_user_model()(
+            **{api_settings.USER_ID_FIELD: user_id},
+            username=validated_token.get("username", ""),
+            is_staff=validated_token.get("is_staff", False),
+            is_superuser=validated_token.get("is_superuser", False),
+            is_active=True,
+        )
+        user._state.adding = False
+        return user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def _invalidate_cached_user(sender, instance, using, **kwargs):
+    # Not before the commit: a request in between would cache the old row again.
+    transaction.on_commit(partial(invalidate_user, instance.pk), using=using)
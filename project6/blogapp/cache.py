@@ -0,0 +1,141 @@
+"""
+Response cache for the read-only blog API endpoints.
+
+Cached entries are keyed on the request host and path, its query parameters
+and the authentication class that accepted the request. Every key also embeds the
+current *generation* of the scopes it depends on, so invalidating a scope is a
+single cache write that makes all older entries unreachable; they then expire
+on their own. Scopes used by the views:
+
+* ``all``        -- every cached response (bumped by deleting all posts)
+* ``post-list``  -- the paginated post lists
+* ``post:<pk>``  -- the detail response of a single post
+
+The backend is whichever Django cache ``BLOG_RESPONSE_CACHE_ALIAS`` names, so
+tests can use locmem while production points it at a file or Redis cache.
+Setting ``BLOG_RESPONSE_CACHE_TIMEOUT`` to 0 turns the cache off.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    key_prefix = "blog:response"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "BLOG_RESPONSE_CACHE_ALIAS", "default")]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "BLOG_RESPONSE_CACHE_TIMEOUT", 60)
+
+    @property
+    def enabled(self):
+        return self.timeout != 0
+
+    def key_for(self, request, scopes):
+        """Build the cache key of ``request`` for the current scope generations."""
+        authenticator = request.successful_authenticator
+        auth = type(authenticator).__name__ if authenticator else "anonymous"
+        params = sorted(request.query_params.lists())
+        identity = (request.get_host(), request.path, params, auth)
+        digest = hashlib.sha256(repr(identity).encode()).hexdigest()
+        generations = ":".join(self._generations(scopes))
+        return f"{self.key_prefix}:{generations}:{digest}"
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self._count("hits" if data is not None else "misses")
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.timeout)
+
+    def invalidate(self, *scopes):
+        """Make every cached response depending on ``scopes`` unreachable."""
+        self.cache.set_many(
+            {self._generation_key(scope): uuid.uuid4().hex for scope in scopes},
+            None,
+        )
+
+    def invalidate_post(self, pk):
+        """Invalidate the detail of post ``pk`` and every post list."""
+        self.invalidate_posts([pk])
+
+    def invalidate_posts(self, pks):
+        """Invalidate the details of the posts ``pks`` and every post list."""
+        self.invalidate("post-list", *(f"post:{pk}" for pk in pks))
+
+    def stats(self):
+        counters = self.cache.get_many(
+            [self._stat_key("hits"), self._stat_key("misses")]
+        )
+        return {
+            "hits": counters.get(self._stat_key("hits"), 0),
+            "misses": counters.get(self._stat_key("misses"), 0),
+        }
+
+    def _generations(self, scopes):
+        keys = [self._generation_key(scope) for scope in scopes]
+        found = self.cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # A fresh random generation can never match an entry written
+                # before the old generation was evicted.
+                value = uuid.uuid4().hex
+                if not self.cache.add(key, value, None):
+                    value = self.cache.get(key, value)
+                found[key] = value
+        return [found[key] for key in keys]
+
+    def _count(self, name):
+        key = self._stat_key(name)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+    def _generation_key(self, scope):
+        return f"{self.key_prefix}:generation:{scope}"
+
+    def _stat_key(self, name):
+        return f"{self.key_prefix}:stats:{name}"
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serve ``GET`` requests of an API view from ``response_cache``.
+
+    Views list the scopes their response depends on in ``get_cache_scopes()``
+    and invalidate them from their write hooks.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache.enabled:
+            return super().get(request, *args, **kwargs)
+
+        key = response_cache.key_for(request, ["all", *self.get_cache_scopes()])
+        data = response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,74 @@
+"""
+Conditional request support (``ETag`` / ``Last-Modified``) for API views.
+
+Views compute their validators from a handful of columns instead of from the
+serialized body, so a ``304 Not Modified`` costs one small query and no
+serialization at all.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def make_validators(*parts, timestamps=()):
+    """
+    Build an ``(etag, last_modified)`` pair.
+
+    ``parts`` are hashed into a strong ETag; ``last_modified`` is the latest of
+    ``timestamps`` as a Unix timestamp, or None if there are none.
+    """
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    moments = [moment for moment in timestamps if moment is not None]
+    last_modified = int(max(moments).timestamp()) if moments else None
+    return quote_etag(digest), last_modified
+
+
+class ConditionalRequestMixin:
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` on GET with 304 and check
+    ``If-Match`` / ``If-Unmodified-Since`` before updates, answering 412 when the
+    client's copy is stale.
+
+    Views implement ``get_validators()`` returning ``(etag, last_modified)``, or
+    None when the resource does not exist.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is not None:
+            conditional = get_conditional_response(
+                request, etag=validators[0], last_modified=validators[1]
+            )
+            if conditional is not None:
+                return conditional
+
+        response = super().get(request, *args, **kwargs)
+        if validators is not None and response.status_code == 200:
+            self.set_validator_headers(response, validators)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is not None:
+            conditional = get_conditional_response(
+                request, etag=validators[0], last_modified=validators[1]
+            )
+            if conditional is not None:
+                return conditional
+
+        response = super().update(request, *args, **kwargs)
+        validators = self.get_validators()
+        if validators is not None and response.status_code == 200:
+            self.set_validator_headers(response, validators)
+        return response
+
+    def set_validator_headers(self, response, validators):
+        etag, last_modified = validators
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
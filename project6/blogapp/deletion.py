@@ -0,0 +1,137 @@
+"""
+Chunked deletion of posts together with their comments and likes.
+
+``Post.objects.all().delete()`` makes Django's collector load every post (and
+cascade through every related row) before issuing a single huge DELETE that
+holds the write lock for its whole duration. ``ChunkedPostDeleter`` instead
+walks the posts in pk order and removes comments, likes and finally the posts
+themselves in batches of ``chunk_size`` rows, each batch in its own short
+transaction, so memory stays bounded and other writers get the lock between
+batches.
+
+``start_delete_job`` runs a deleter in a background thread and publishes its
+progress in the cache named by ``BLOG_JOB_CACHE_ALIAS`` so that any worker can
+answer status requests.
+"""
+
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import response_cache
+from .models import Comment, Post
+
+
+class ChunkedPostDeleter:
+    def __init__(self, queryset=None, chunk_size=1000, progress=None):
+        self.queryset = Post.objects.all() if queryset is None else queryset
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.deleted = {"posts": 0, "comments": 0, "likes": 0}
+
+    def run(self):
+        """Delete every post in the queryset; returns the per-kind counts."""
+        while True:
+            post_ids = list(
+                self.queryset.order_by("pk").values_list("pk", flat=True)[
+                    : self.chunk_size
+                ]
+            )
+            if not post_ids:
+                break
+            self.deleted["comments"] += self._delete_in_batches(
+                Comment.objects.filter(post_id__in=post_ids)
+            )
+            self.deleted["likes"] += self._delete_in_batches(
+                Post.likes.through.objects.filter(post_id__in=post_ids)
+            )
+            with transaction.atomic():
+                _, per_model = Post.objects.filter(pk__in=post_ids).delete()
+            self.deleted["posts"] += per_model.get(Post._meta.label, 0)
+            response_cache.invalidate("all")
+            if self.progress is not None:
+                self.progress(dict(self.deleted))
+        return dict(self.deleted)
+
+    def _delete_in_batches(self, queryset):
+        model = queryset.model
+        total = 0
+        while True:
+            ids = list(queryset.values_list("pk", flat=True)[: self.chunk_size])
+            if not ids:
+                return total
+            # The base manager skips the counter upkeep of
+            # CommentQuerySet.delete(): the posts are deleted next anyway.
+            with transaction.atomic():
+                deleted, _ = model._base_manager.filter(pk__in=ids).delete()
+            total += deleted
+
+
+def _job_cache():
+    return caches[getattr(settings, "BLOG_JOB_CACHE_ALIAS", "default")]
+
+
+def _job_key(job_id):
+    return f"blog:job:{job_id}"
+
+
+def get_job(job_id):
+    """Return the status dict of a deletion job, or None if it is unknown."""
+    return _job_cache().get(_job_key(job_id))
+
+
+def _save_job(job):
+    _job_cache().set(_job_key(job["job_id"]), job, 24 * 60 * 60)
+
+
+def _run_job(job, chunk_size):
+    def progress(deleted):
+        job["deleted"] = deleted
+        _save_job(job)
+
+    try:
+        ChunkedPostDeleter(chunk_size=chunk_size, progress=progress).run()
+        job["status"] = "done"
+    except Exception as exc:
+        job["status"] = "failed"
+        job["error"] = str(exc)
+        raise
+    finally:
+        job["finished_at"] = timezone.now().isoformat()
+        _save_job(job)
+
+
+def start_delete_job(chunk_size=1000):
+    """
+    Start deleting every post and return the job status dict.
+
+    The job runs in a background thread unless ``BLOG_DELETE_JOBS_ASYNC`` is
+    False, in which case it completes before this function returns.
+    """
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "status": "running",
+        "total_posts": Post.objects.count(),
+        "deleted": {"posts": 0, "comments": 0, "likes": 0},
+        "started_at": timezone.now().isoformat(),
+        "finished_at": None,
+        "error": None,
+    }
+    _save_job(job)
+
+    if not getattr(settings, "BLOG_DELETE_JOBS_ASYNC", True):
+        _run_job(job, chunk_size)
+        return job
+
+    def target():
+        try:
+            _run_job(job, chunk_size)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=target, name=f"delete-posts-{job['job_id']}").start()
+    return dict(job)
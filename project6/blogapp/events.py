@@ -0,0 +1,247 @@
+"""
+Live comment events for Server-Sent Event streams.
+
+Creating or deleting a comment publishes a ``comment-created`` or
+``comment-deleted`` event once the transaction commits. Events go through the
+backend named by ``BLOG_EVENTS_BACKEND``, which fans them out to every worker
+process; each process then hands them to its ``hub``, which queues them for the
+streams open on that post:
+
+* ``LocalBackend``  -- delivers straight to this process's hub; enough for a
+  single ASGI worker.
+* ``RedisBackend``  -- publishes on a Redis channel (``BLOG_EVENTS_REDIS_URL``)
+  that every worker subscribes to; needs the ``redis`` package.
+
+Event ids are ``<time_ns>-<sequence>``, unique but not ordered across
+processes: two workers publishing at once can have their events reach the
+Redis channel in the opposite order to their ids. Every hub receives the
+channel in the same order, though, so a stream reconnecting with
+``Last-Event-ID`` is sent the events that follow that id in its hub's history,
+whatever their ids. The hub keeps the last 100 events of each of the 1000
+most recently active posts; if the client's last event is no longer among
+them, the stream is sent a ``reset`` event instead and reloads the comments.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+_sequence = itertools.count()
+
+
+class Event:
+    def __init__(self, post_id, name, data, id=None):
+        self.post_id = post_id
+        self.name = name
+        self.data = data
+        self.id = id or f"{time.time_ns()}-{next(_sequence)}"
+
+    def encode(self):
+        """The event in the ``text/event-stream`` wire format."""
+        data = json.dumps(self.data, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.name}\ndata: {data}\n\n"
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "post_id": self.post_id,
+                "name": self.name,
+                "data": self.data,
+                "id": self.id,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, payload):
+        return cls(**json.loads(payload))
+
+
+class Subscription:
+    """A stream's queue of events, fed from any thread."""
+
+    def __init__(self, post_id, loop, maxsize):
+        self.post_id = post_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client too slow to keep up reloads instead of growing the queue.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class CommentHub:
+    """In-process broadcast of events to the streams subscribed to each post."""
+
+    def __init__(self, history=100, max_posts=1000, queue_size=100):
+        self.history = history
+        self.max_posts = max_posts
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._histories = OrderedDict()
+
+    def subscribe(self, post_id, last_event_id=None):
+        """
+        Register a stream on ``post_id`` (from inside its event loop) and return
+        ``(subscription, backlog)``. ``backlog`` holds the events after
+        ``last_event_id``, or is None if some of them are no longer kept.
+        """
+        subscription = Subscription(
+            post_id, asyncio.get_running_loop(), self.queue_size
+        )
+        with self._lock:
+            self._subscriptions.setdefault(post_id, set()).add(subscription)
+            backlog = self._backlog(post_id, last_event_id)
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.post_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.post_id, None)
+
+    def deliver(self, event):
+        """Record ``event`` and queue it for the streams of its post."""
+        with self._lock:
+            history = self._histories.pop(event.post_id, None)
+            if history is None:
+                history = deque(maxlen=self.history)
+            history.append(event)
+            self._histories[event.post_id] = history
+            while len(self._histories) > self.max_posts:
+                self._histories.popitem(last=False)
+            subscriptions = list(self._subscriptions.get(event.post_id, ()))
+        for subscription in subscriptions:
+            subscription.push(event)
+
+    def subscriber_count(self, post_id=None):
+        with self._lock:
+            if post_id is not None:
+                return len(self._subscriptions.get(post_id, ()))
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+    def _backlog(self, post_id, last_event_id):
+        if not last_event_id:
+            return []
+        # Found by id rather than compared with it: ids from different
+        # workers are not in delivery order. Unless the client's last event is
+        # still kept, events after it may have been dropped.
+        history = list(self._histories.get(post_id, ()))
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].id == last_event_id:
+                return history[index + 1 :]
+        return None
+
+
+hub = CommentHub()
+
+
+class LocalBackend:
+    """Delivers events to this process only."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, event):
+        self.hub.deliver(event)
+
+    def listen(self):
+        pass
+
+
+class RedisBackend:
+    """Fans events out to every process through a Redis pub/sub channel."""
+
+    channel = "blog:comment-events"
+
+    def __init__(self, hub):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBackend requires the redis package.")
+        self.hub = hub
+        self.client = redis.Redis.from_url(
+            getattr(settings, "BLOG_EVENTS_REDIS_URL", "redis://localhost:6379/0")
+        )
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, event):
+        self.client.publish(self.channel, event.to_json())
+
+    def listen(self):
+        """Make sure this process receives events published by the others."""
+        self._ensure_listening()
+
+    def _ensure_listening(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="comment-events", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            self.hub.deliver(Event.from_json(message["data"]))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(
+                settings, "BLOG_EVENTS_BACKEND", "blogapp.events.LocalBackend"
+            )
+            _backend = import_string(path)(hub)
+        return _backend
+
+
+def publish(post_id, name, data):
+    get_backend().publish(Event(post_id, name, data))
+
+
+def _publish_created(comment):
+    from .serializers import CommentSerializer
+
+    data = dict(CommentSerializer(comment).data, post_id=comment.post_id)
+    publish(comment.post_id, "comment-created", data)
+
+
+def comment_created(comment):
+    """Publish ``comment-created`` for ``comment`` when the transaction commits."""
+    transaction.on_commit(partial(_publish_created, comment), robust=True)
+
+
+def comment_deleted(post_id, comment_id):
+    """Publish ``comment-deleted`` when the transaction commits."""
+    data = {"id": comment_id, "post_id": post_id}
+    transaction.on_commit(
+        partial(publish, post_id, "comment-deleted", data), robust=True
+    )
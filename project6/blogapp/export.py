@@ -0,0 +1,189 @@
+"""
+Streaming export of every post with its comments and like count.
+
+``dumpdata`` builds whole querysets in memory before writing anything. The
+exporters here walk the posts in pk order with ``QuerySet.iterator()``, which
+reads ``chunk_size`` posts at a time (through a server-side cursor where the
+database has them) and prefetches the comments of each chunk with one more
+query. Output is produced chunk by chunk, so memory stays bounded by the chunk
+size whatever the number of rows, and the first chunk goes out as soon as its
+two queries return.
+
+Two formats are available:
+
+* ``ndjson`` -- one JSON object per post, its comments embedded as a list.
+* ``csv``    -- one row per post followed by one row per comment of that post,
+  told apart by the ``type`` column.
+
+Like counts come from the denormalized ``Post.likes_count`` counter; run
+``reconcile_post_counters`` first if they may have drifted.
+
+Under ASGI, Django would drain a sync iterator into a list before sending a
+byte of it; wrap the chunks in ``aiterate()`` there so that each one is made
+in a thread and sent before the next is read.
+"""
+
+import csv
+import io
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    "type",
+    "id",
+    "post_id",
+    "author",
+    "title",
+    "text",
+    "date",
+    "likes_count",
+    "comments_count",
+]
+
+
+def export_queryset(queryset=None):
+    """Posts in pk order with only the columns the export writes."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    # Newest first, like every other view of a post's comments; served from
+    # the (post, -created_date, -id) index for each chunk's IN list.
+    comments = (
+        Comment.objects.select_related("author")
+        .only("id", "post_id", "text", "created_date", "author__username")
+        .order_by("post_id", "-created_date", "-id")
+    )
+    return (
+        queryset.select_related("author")
+        .only(
+            "id",
+            "title",
+            "content",
+            "published_date",
+            "updated_at",
+            "likes_count",
+            "comments_count",
+            "author__username",
+        )
+        .prefetch_related(Prefetch("comments", queryset=comments))
+        .order_by("pk")
+    )
+
+
+def _chunks(queryset, chunk_size):
+    """Yield lists of at most ``chunk_size`` posts, one database chunk each."""
+    chunk = []
+    for post in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        chunk.append(post)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _post_record(post):
+    return {
+        "id": post.pk,
+        "title": post.title,
+        "content": post.content,
+        "author": post.author.username,
+        "published_date": post.published_date,
+        "updated_at": post.updated_at,
+        "likes_count": post.likes_count,
+        "comments_count": post.comments_count,
+        "comments": [
+            {
+                "id": comment.pk,
+                "author": comment.author.username,
+                "text": comment.text,
+                "created_date": comment.created_date,
+            }
+            for comment in post.comments.all()
+        ],
+    }
+
+
+def ndjson_export(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield the export as NDJSON text, one string per chunk of posts."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for chunk in _chunks(queryset, chunk_size):
+        yield "".join(encoder.encode(_post_record(post)) + "\n" for post in chunk)
+
+
+def csv_export(queryset=None, chunk_size=CHUNK_SIZE):
+    """Yield the export as CSV text: the header, then one string per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    # Sent before the first query runs.
+    yield flush()
+    for chunk in _chunks(queryset, chunk_size):
+        for post in chunk:
+            writer.writerow(
+                [
+                    "post",
+                    post.pk,
+                    post.pk,
+                    post.author.username,
+                    post.title,
+                    post.content,
+                    post.published_date.isoformat(),
+                    post.likes_count,
+                    post.comments_count,
+                ]
+            )
+            for comment in post.comments.all():
+                writer.writerow(
+                    [
+                        "comment",
+                        comment.pk,
+                        post.pk,
+                        comment.author.username,
+                        "",
+                        comment.text,
+                        comment.created_date.isoformat(),
+                        "",
+                        "",
+                    ]
+                )
+        yield flush()
+
+
+async def aiterate(chunks):
+    """Yield the strings of the sync iterator ``chunks``, reading one at a time."""
+    chunks = iter(chunks)
+    # Thread-sensitive, so every step runs in the thread that holds the
+    # request's database connection and its cursor.
+    step = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while (chunk := await step(chunks, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(chunks, "close"):
+            await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_export),
+    "csv": ("text/csv", csv_export),
+}
+
+
+def export(format, queryset=None, chunk_size=CHUNK_SIZE):
+    """Return ``(content_type, chunks)`` for the export in ``format``."""
+    content_type, exporter = FORMATS[format]
+    return content_type, exporter(queryset, chunk_size)
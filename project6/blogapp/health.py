@@ -0,0 +1,161 @@
+"""
+Liveness and readiness checks answered before the rest of the middleware.
+
+``HealthCheckMiddleware`` sits first in ``MIDDLEWARE`` and returns straight
+away for two paths, so orchestrator and load-balancer polls never run the
+session, CSRF, authentication or metrics middleware:
+
+* ``BLOG_HEALTH_LIVE_PATH`` (``/health/live/``) -- the process is serving
+  requests; checks nothing else.
+* ``BLOG_HEALTH_READY_PATH`` (``/health/ready/``) -- the database answers, every
+  migration is applied, every configured cache works and the media and static
+  directories are usable. Answers 503 if any probe fails.
+
+Readiness results are cached per process for ``BLOG_HEALTH_CACHE_SECONDS``
+and concurrent polls share one run of the probes, so however often the
+endpoint is polled the probes run at most once per interval per worker. A
+successful migration check is kept for the life of the process, since applying
+migrations requires a deploy anyway.
+
+The middleware runs natively under both WSGI and ASGI: under ASGI the
+liveness path is answered on the event loop and only the readiness probes,
+which block, go to a thread.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+
+def check_database():
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+def check_migrations():
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        pending = ", ".join(f"{m.app_label}.{m.name}" for m, _ in plan[:5])
+        raise RuntimeError(f"{len(plan)} unapplied migration(s): {pending}")
+
+
+def check_caches():
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        key = f"blog:health:{os.getpid()}"
+        cache.set(key, "ok", 10)
+        if cache.get(key) != "ok":
+            raise RuntimeError(f"cache {alias!r} did not return a written value")
+
+
+def check_disk():
+    min_free = getattr(settings, "BLOG_HEALTH_MIN_FREE_BYTES", 50 * 1024 * 1024)
+    directories = [(settings.MEDIA_ROOT, os.W_OK), (settings.STATIC_ROOT, os.R_OK)]
+    for path, mode in directories:
+        if not os.path.isdir(path) or not os.access(path, mode):
+            access = "writable" if mode == os.W_OK else "readable"
+            raise RuntimeError(f"{path} is not a {access} directory")
+        free = shutil.disk_usage(path).free
+        if free < min_free:
+            raise RuntimeError(f"{path} has only {free} bytes free")
+
+
+PROBES = {
+    "database": check_database,
+    "migrations": check_migrations,
+    "cache": check_caches,
+    "disk": check_disk,
+}
+
+
+class ReadinessProbe:
+    """Runs ``PROBES`` and caches the outcome for a few seconds."""
+
+    def __init__(self, probes):
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0.0
+        self._migrations_ok = False
+
+    def __call__(self):
+        """Return ``(ready, report)``, probing only if the cache is stale."""
+        ttl = getattr(settings, "BLOG_HEALTH_CACHE_SECONDS", 5)
+        with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= ttl:
+                self._result = self._run()
+                self._checked_at = time.monotonic()
+            return self._result
+
+    def clear(self):
+        with self._lock:
+            self._result = None
+            self._migrations_ok = False
+
+    def _run(self):
+        checks = {}
+        for name, probe in self.probes.items():
+            if name == "migrations" and self._migrations_ok:
+                checks[name] = {"status": "ok", "duration_ms": 0.0}
+                continue
+            started = time.perf_counter()
+            try:
+                probe()
+            except Exception as exc:
+                check = {"status": "fail", "error": f"{type(exc).__name__}: {exc}"}
+            else:
+                check = {"status": "ok"}
+                if name == "migrations":
+                    self._migrations_ok = True
+            check["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            checks[name] = check
+        ready = all(check["status"] == "ok" for check in checks.values())
+        return ready, {"status": "ok" if ready else "fail", "checks": checks}
+
+
+readiness = ReadinessProbe(PROBES)
+
+
+class HealthCheckMiddleware:
+    """Answer the liveness and readiness paths; keep it first in ``MIDDLEWARE``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.live_path = getattr(settings, "BLOG_HEALTH_LIVE_PATH", "/health/live/")
+        self.ready_path = getattr(settings, "BLOG_HEALTH_READY_PATH", "/health/ready/")
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path == self.live_path:
+            return JsonResponse({"status": "ok"})
+        if request.path == self.ready_path:
+            return self._ready_response(readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path == self.live_path:
+            return JsonResponse({"status": "ok"})
+        if request.path == self.ready_path:
+            return self._ready_response(await sync_to_async(readiness)())
+        return await self.get_response(request)
+
+    def _ready_response(self, result):
+        ready, report = result
+        return JsonResponse(report, status=200 if ready else 503)
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp.deletion import ChunkedPostDeleter
+from blogapp.models import Post
+
+
+class Command(BaseCommand):
+    help = "Delete every post with its comments and likes in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows removed per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not prompt for confirmation.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be positive.")
+
+        total = Post.objects.count()
+        if options["interactive"]:
+            answer = input(f"This will delete all {total} posts. Type 'yes' to go on: ")
+            if answer != "yes":
+                raise CommandError("Deletion cancelled.")
+
+        def progress(deleted):
+            self.stdout.write(
+                f"Deleted {deleted['posts']}/{total} posts, "
+                f"{deleted['comments']} comments, {deleted['likes']} likes"
+            )
+
+        deleted = ChunkedPostDeleter(
+            chunk_size=options["chunk_size"], progress=progress
+        ).run()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted['posts']} posts, {deleted['comments']} comments "
+                f"and {deleted['likes']} likes."
+            )
+        )
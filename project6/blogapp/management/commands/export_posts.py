@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import export
+
+
+class Command(BaseCommand):
+    help = "Export every post with its comments and like count as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(export.FORMATS),
+            default="ndjson",
+            help="Output format (default: ndjson).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.CHUNK_SIZE,
+            help=f"Number of posts read per query (default: {export.CHUNK_SIZE}).",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="File to write to (default: standard output).",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] <= 0:
+            raise CommandError("--chunk-size must be positive.")
+
+        _, chunks = export.export(options["format"], chunk_size=options["chunk_size"])
+        if options["output"]:
+            # newline="" keeps the CSV writer's \r\n row endings intact.
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                out.writelines(chunks)
+            if options["verbosity"] > 0:
+                self.stderr.write(
+                    self.style.SUCCESS(f"Exported posts to {options['output']}.")
+                )
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute drifted Post.likes_count and Post.comments_count values."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of posts checked per batch (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        checked = fixed = 0
+
+        while True:
+            pks = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            fixed += Post.objects.filter(pk__in=pks).reconcile_counters()
+            checked += len(pks)
+            last_pk = pks[-1]
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Checked {checked} posts, fixed {fixed}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} posts, fixed {fixed} counters.")
+        )
@@ -0,0 +1,397 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records, for every request, labelled by URL name and
+method:
+
+* ``blog_http_request_duration_seconds`` -- latency until the response is built
+* ``blog_db_queries_per_request`` / ``blog_db_query_duration_seconds`` -- how
+  many queries the request ran and how long the database took
+* ``blog_serialization_duration_seconds`` -- time spent in serializer
+  ``to_representation()`` plus rendering the response body
+* ``blog_http_response_size_bytes`` -- size of non-streaming response bodies
+
+``metrics_view`` serves them at ``/metrics`` to clients whose address is in
+``BLOG_METRICS_ALLOWED_NETWORKS`` (loopback by default) and answers 403 to the
+rest. The client address is ``REMOTE_ADDR``; behind a proxy, allow the
+proxy's network or scrape the workers directly.
+
+The middleware runs natively under both WSGI and ASGI. Queries are counted by
+an execute wrapper installed on every connection when it opens, which reads
+the current request's state from a context variable, so queries the ORM runs
+in ``sync_to_async`` threads are counted too.
+
+Values live in a per-process ``MetricsRegistry``. When ``BLOG_METRICS_DIR`` is
+set, each process also writes a snapshot of its values to ``<pid>.json`` in
+that directory (at most every ``BLOG_METRICS_FLUSH_INTERVAL`` seconds), and a
+scrape sums the snapshots of every process, so whichever gunicorn worker
+answers reports the totals of all of them. Clear the directory when the server
+(re)starts, as Prometheus expects counters to reset with the server.
+"""
+
+import contextvars
+import ipaddress
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+
+class MetricsRegistry:
+    """
+    Histogram values of one process, optionally shared through a directory.
+
+    Each series is stored as its per-bucket (non-cumulative) counts followed by
+    the sum of observed values, so snapshots of several processes add up
+    element-wise.
+    """
+
+    def __init__(self, directory=None, pid=None):
+        self._directory = directory
+        self._pid = pid
+        self._owner = self.pid
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._values = {}
+        self._flushed_at = 0.0
+
+    @property
+    def pid(self):
+        return self._pid if self._pid is not None else os.getpid()
+
+    @property
+    def directory(self):
+        if self._directory is not None:
+            return self._directory
+        return getattr(settings, "BLOG_METRICS_DIR", None)
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def observe(self, metric, value, **labels):
+        key = (metric.name, tuple(str(labels[name]) for name in metric.labelnames))
+        with self._lock:
+            if self._owner != self.pid:
+                # Forked from a process that had already recorded requests:
+                # those belong to the parent's snapshot, not this one.
+                self._owner = self.pid
+                self._values = {}
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(metric.buckets) + [0.0]
+            for index, bound in enumerate(metric.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-1] += value
+        self._maybe_flush()
+
+    def flush(self):
+        """Write this process's values to ``<directory>/<pid>.json``."""
+        directory = self.directory
+        if not directory:
+            return
+        with self._lock:
+            snapshot = [
+                [name, list(labels), list(values)]
+                for (name, labels), values in self._values.items()
+            ]
+            self._flushed_at = time.monotonic()
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        temporary = path / f".{self.pid}.json.tmp"
+        temporary.write_text(json.dumps(snapshot))
+        os.replace(temporary, path / f"{self.pid}.json")
+
+    def collect(self):
+        """Return ``{(name, labels): values}`` summed over every process."""
+        directory = self.directory
+        if not directory:
+            with self._lock:
+                return {key: list(values) for key, values in self._values.items()}
+
+        self.flush()
+        totals = {}
+        for snapshot in Path(directory).glob("*.json"):
+            try:
+                series = json.loads(snapshot.read_text())
+            except (OSError, ValueError):
+                # Vanished or half-written by a process that just exited.
+                continue
+            for name, labels, values in series:
+                key = (name, tuple(labels))
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], values)]
+                else:
+                    totals[key] = values
+        return totals
+
+    def render(self):
+        """Render every registered metric in the Prometheus text format."""
+        values = self.collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} histogram")
+            series = sorted(
+                (labels, counts)
+                for (name, labels), counts in values.items()
+                if name == metric.name
+            )
+            for labels, counts in series:
+                pairs = list(zip(metric.labelnames, labels))
+                cumulative = 0
+                for bound, count in zip(metric.buckets, counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(
+                        f"{metric.name}_bucket{_labels(pairs + [('le', le)])} "
+                        f"{cumulative}"
+                    )
+                lines.append(f"{metric.name}_sum{_labels(pairs)} {counts[-1]!r}")
+                lines.append(f"{metric.name}_count{_labels(pairs)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def _maybe_flush(self):
+        interval = getattr(settings, "BLOG_METRICS_FLUSH_INTERVAL", 1.0)
+        if self.directory and time.monotonic() - self._flushed_at >= interval:
+            self.flush()
+
+
+def _labels(pairs):
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.register(
+    Histogram(
+        "blog_http_request_duration_seconds",
+        "Time to build the response of a request.",
+        ("route", "method", "status"),
+        LATENCY_BUCKETS,
+    )
+)
+DB_QUERIES = registry.register(
+    Histogram(
+        "blog_db_queries_per_request",
+        "Database queries run by a request.",
+        ("route", "method"),
+        QUERY_COUNT_BUCKETS,
+    )
+)
+DB_DURATION = registry.register(
+    Histogram(
+        "blog_db_query_duration_seconds",
+        "Time a request spent waiting on the database.",
+        ("route", "method"),
+        LATENCY_BUCKETS,
+    )
+)
+SERIALIZATION_DURATION = registry.register(
+    Histogram(
+        "blog_serialization_duration_seconds",
+        "Time a request spent serializing and rendering its response body.",
+        ("route", "method"),
+        LATENCY_BUCKETS,
+    )
+)
+RESPONSE_SIZE = registry.register(
+    Histogram(
+        "blog_http_response_size_bytes",
+        "Size of non-streaming response bodies.",
+        ("route", "method", "status"),
+        SIZE_BUCKETS,
+    )
+)
+
+
+class _RequestState:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization = 0.0
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+_state = contextvars.ContextVar("blog_metrics_state", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    state = _state.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    return state(execute, sql, params, many, context)
+
+
+def _instrument(connection):
+    # First in the list: connection.execute_wrapper() pops the last one.
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    _instrument(connection)
+
+
+class TimedSerializerMixin:
+    """
+    Add the time spent in ``to_representation()`` to the request's
+    serialization time. Nested serializers are covered by their parent.
+    """
+
+    def to_representation(self, instance):
+        state = _state.get()
+        if state is None or state.depth:
+            return super().to_representation(instance)
+        state.depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            state.depth -= 1
+            state.serialization += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Record the request metrics above; keep it first in ``MIDDLEWARE``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Awaited by the handler instead of being sent to a thread.
+            self.process_template_response = self._process_template_response_async
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self._start()
+        token = _state.set(state)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        self._finish(request, response, state, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        state = self._start()
+        token = _state.set(state)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        self._finish(request, response, state, time.perf_counter() - started)
+        return response
+
+    def _start(self):
+        # Connections opened before this module was imported.
+        for alias in connections:
+            _instrument(connections[alias])
+        return _RequestState()
+
+    def _finish(self, request, response, state, elapsed):
+        match = getattr(request, "resolver_match", None)
+        route = match.view_name if match else "unmatched"
+        if route != "metrics":
+            self.record(request, response, route, state, elapsed)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time it too.
+        state = _state.get()
+        if state is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                state.serialization += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def _process_template_response_async(self, request, response):
+        return self.process_template_response(request, response)
+
+    def record(self, request, response, route, state, elapsed):
+        method = request.method
+        code = response.status_code
+        registry.observe(
+            REQUEST_DURATION, elapsed, route=route, method=method, status=code
+        )
+        registry.observe(DB_QUERIES, state.queries, route=route, method=method)
+        registry.observe(DB_DURATION, state.db_time, route=route, method=method)
+        registry.observe(
+            SERIALIZATION_DURATION, state.serialization, route=route, method=method
+        )
+        if not response.streaming:
+            registry.observe(
+                RESPONSE_SIZE,
+                len(response.content),
+                route=route,
+                method=method,
+                status=code,
+            )
+
+
+def _allowed_networks():
+    networks = getattr(settings, "BLOG_METRICS_ALLOWED_NETWORKS", None)
+    if networks is None:
+        networks = ["127.0.0.0/8", "::1/128"]
+    return [ipaddress.ip_network(network) for network in networks]
+
+
+def metrics_view(request):
+    try:
+        client = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        client = None
+    if client is None or not any(client in net for net in _allowed_networks()):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
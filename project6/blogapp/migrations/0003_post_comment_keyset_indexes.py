@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blogapp", "0002_alter_post_published_date"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_date", "-id"],
+                name="comment_post_created_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-published_date", "-id"], name="post_published_id_idx"
+            ),
+        ),
+    ]
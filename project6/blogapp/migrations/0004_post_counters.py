@@ -0,0 +1,45 @@
+# Generated by Django 5.2.2 on 2026-10-18 02:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset):
+    counted = (
+        queryset.filter(post_id=OuterRef("pk"))
+        .order_by()
+        .values("post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("blogapp", "Post")
+    Comment = apps.get_model("blogapp", "Comment")
+    Post.objects.update(
+        likes_count=_count(Post.likes.through.objects.all()),
+        comments_count=_count(Comment.objects.all()),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blogapp", "0003_post_comment_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    Post = apps.get_model("blogapp", "Post")
+    Post.objects.update(updated_at=F("published_date"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blogapp", "0004_post_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+from django.db import migrations
+
+# The index rows of a post and of a comment live side by side in one FTS5
+# table: rowid 2 * id for posts, 2 * id + 1 for comments.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE blogapp_search USING fts5(
+        title, body, post_id UNINDEXED, tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO blogapp_search (rowid, title, body, post_id)
+    SELECT id * 2, title, content, id FROM blogapp_post
+    """,
+    """
+    INSERT INTO blogapp_search (rowid, title, body, post_id)
+    SELECT id * 2 + 1, '', text, post_id FROM blogapp_comment
+    """,
+    """
+    CREATE TRIGGER blogapp_post_search_insert AFTER INSERT ON blogapp_post BEGIN
+        INSERT INTO blogapp_search (rowid, title, body, post_id)
+        VALUES (new.id * 2, new.title, new.content, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER blogapp_post_search_update
+    AFTER UPDATE OF title, content ON blogapp_post BEGIN
+        DELETE FROM blogapp_search WHERE rowid = old.id * 2;
+        INSERT INTO blogapp_search (rowid, title, body, post_id)
+        VALUES (new.id * 2, new.title, new.content, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER blogapp_post_search_delete AFTER DELETE ON blogapp_post BEGIN
+        DELETE FROM blogapp_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER blogapp_comment_search_insert
+    AFTER INSERT ON blogapp_comment BEGIN
+        INSERT INTO blogapp_search (rowid, title, body, post_id)
+        VALUES (new.id * 2 + 1, '', new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER blogapp_comment_search_update
+    AFTER UPDATE OF text, post_id ON blogapp_comment BEGIN
+        DELETE FROM blogapp_search WHERE rowid = old.id * 2 + 1;
+        INSERT INTO blogapp_search (rowid, title, body, post_id)
+        VALUES (new.id * 2 + 1, '', new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER blogapp_comment_search_delete
+    AFTER DELETE ON blogapp_comment BEGIN
+        DELETE FROM blogapp_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS blogapp_post_search_insert",
+    "DROP TRIGGER IF EXISTS blogapp_post_search_update",
+    "DROP TRIGGER IF EXISTS blogapp_post_search_delete",
+    "DROP TRIGGER IF EXISTS blogapp_comment_search_insert",
+    "DROP TRIGGER IF EXISTS blogapp_comment_search_update",
+    "DROP TRIGGER IF EXISTS blogapp_comment_search_delete",
+    "DROP TABLE IF EXISTS blogapp_search",
+]
+
+# The expressions must stay identical to PostgreSQLSearchBackend.vectors so the
+# planner can match them against these indexes.
+POSTGRESQL_FORWARD = [
+    """
+    CREATE INDEX post_search_vector_idx ON blogapp_post USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ))
+    """,
+    """
+    CREATE INDEX comment_search_vector_idx ON blogapp_comment USING GIN (
+        (to_tsvector('english', coalesce(text, '')))
+    )
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS post_search_vector_idx",
+    "DROP INDEX IF EXISTS comment_search_vector_idx",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blogapp", "0006_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(
+                {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}
+            ),
+            run_for_vendor(
+                {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRESQL_BACKWARD}
+            ),
+        ),
+    ]
@@ -5,27 +5,354 @@ The Post model should have fields like title, content, author, and published_dat
 The Comment model should be linked to the Post (each post can have multiple comments) and include fields like author, text, and created_date.
 """
 
-from django.db import models
+from collections import Counter
+
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Now
+from django.db.models.signals import pre_delete
 from django.contrib.auth.models import User
+from django.dispatch import receiver
 from django.utils import timezone
 
+from . import events
+
+
+def _count_subquery(queryset):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows whose ``post_id`` is the outer pk."""
+    counted = (
+        queryset.filter(post_id=OuterRef("pk"))
+        .order_by()
+        .values("post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counted), Value(0))
+
+
+class _LikeUnchanged(Exception):
+    """Raised inside a like transaction to roll back a change already made."""
+
+
+class PostQuerySet(models.QuerySet):
+    def with_details(self):
+        """Join the author and prefetch comments with their authors."""
+        return self.select_related("author").with_comments()
+
+    def with_comments(self, limit=None):
+        """
+        Prefetch each post's comments, newest first, with their authors. With
+        ``limit`` only that many comments are fetched per post and they land in
+        ``recent_comments`` (a sliced prefetch cannot back ``post.comments``).
+        """
+        # Leading with post_id lets the (post, -created_date, -id) index return
+        # the rows of several posts already sorted, without a temporary B-tree.
+        comments = Comment.objects.select_related("author").order_by(
+            "post_id", "-created_date", "-id"
+        )
+        if limit is not None:
+            return self.prefetch_related(
+                models.Prefetch(
+                    "comments", queryset=comments[:limit], to_attr="recent_comments"
+                )
+            )
+        return self.prefetch_related(models.Prefetch("comments", queryset=comments))
+
+    def with_last_comment_date(self):
+        """Annotate ``last_comment_date``, the creation time of the newest comment."""
+        newest = (
+            Comment.objects.filter(post_id=OuterRef("pk"))
+            .order_by("-created_date")
+            .values("created_date")[:1]
+        )
+        return self.annotate(last_comment_date=Subquery(newest))
+
+    def reconcile_counters(self):
+        """
+        Recompute ``likes_count`` and ``comments_count`` for the posts in this
+        queryset. Returns the number of posts whose stored counters had drifted.
+        """
+        actual_likes = _count_subquery(Post.likes.through.objects.all())
+        actual_comments = _count_subquery(Comment.objects.all())
+        drifted = list(
+            self.annotate(actual_likes=actual_likes, actual_comments=actual_comments)
+            .exclude(likes_count=F("actual_likes"), comments_count=F("actual_comments"))
+            .values_list("pk", flat=True)
+        )
+        if drifted:
+            Post.objects.filter(pk__in=drifted).update(
+                likes_count=actual_likes, comments_count=actual_comments
+            )
+        return len(drifted)
+
+    # A like change is two statements in one transaction. The first is an
+    # UPDATE ... RETURNING of the post row: it checks whether the like row
+    # exists, moves likes_count accordingly, takes the post's row lock and
+    # returns the new count. The second inserts or deletes the like row.
+    # Every path locks the post row before the like row, so they cannot
+    # deadlock with each other. When a concurrent request changed the same
+    # like first, the through table's unique (post, user) constraint or a
+    # DELETE of no rows rolls the counter back. Only the requests that change
+    # nothing read the post with a separate SELECT. RETURNING needs SQLite
+    # 3.35+ or PostgreSQL.
+
+    def like(self, pk, user):
+        """
+        Record ``user``'s like on post ``pk``. Returns False if the post was
+        already liked, and raises ``Post.DoesNotExist`` if there is no such post.
+        """
+        return self.set_like(pk, user, True)[1]
+
+    def unlike(self, pk, user):
+        """
+        Remove ``user``'s like from post ``pk``. Returns False if the post was
+        not liked, and raises ``Post.DoesNotExist`` if there is no such post.
+        """
+        return self.set_like(pk, user, False)[1]
+
+    def toggle_like(self, pk, user):
+        """
+        Like post ``pk`` if ``user`` has not liked it yet, otherwise remove the
+        like. Returns True if the post is now liked, and raises
+        ``Post.DoesNotExist`` if there is no such post.
+        """
+        return self.set_like(pk, user)[0]
+
+    def set_like(self, pk, user, liked=None):
+        """
+        Like (``liked=True``), unlike (``False``) or toggle (``None``) post
+        ``pk`` for ``user``. Returns ``(liked, changed, likes_count)`` as of the
+        end of the transaction, and raises ``Post.DoesNotExist`` if there is no
+        such post.
+        """
+        likes = Post.likes.through.objects.using(self.db)
+        try:
+            with transaction.atomic(using=self.db):
+                row = self._move_likes_count(pk, user, liked)
+                if row is not None:
+                    likes_count, was_liked = row
+                    if was_liked:
+                        deleted, _ = likes.filter(post_id=pk, user_id=user.pk).delete()
+                        if not deleted:
+                            raise _LikeUnchanged
+                    else:
+                        likes.create(post_id=pk, user_id=user.pk)
+                    return not was_liked, True, likes_count
+        except (IntegrityError, _LikeUnchanged):
+            pass  # changed by a concurrent request first
+        row = (
+            self.filter(pk=pk)
+            .annotate(liked=Exists(likes.filter(post_id=pk, user_id=user.pk)))
+            .values_list("liked", "likes_count")
+            .first()
+        )
+        if row is None:
+            raise Post.DoesNotExist
+        return row[0], False, row[1]
+
+    def _move_likes_count(self, pk, user, liked):
+        """
+        Move post ``pk``'s ``likes_count`` for a like change and return
+        ``(likes_count, was_liked)``, or None if nothing is to change.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        through = Post.likes.through._meta
+        post = Post._meta
+        count = qn(post.get_field("likes_count").column)
+        greatest = "MAX" if connection.vendor == "sqlite" else "GREATEST"
+        exists = (
+            f"EXISTS (SELECT 1 FROM {qn(through.db_table)} "
+            f"WHERE {qn(through.get_field('post').column)} = %s "
+            f"AND {qn(through.get_field('user').column)} = %s)"
+        )
+        like, unlike = f"{count} + 1", f"{greatest}({count} - 1, 0)"
+        if liked is None:
+            value, condition = f"CASE WHEN {exists} THEN {unlike} ELSE {like} END", ""
+        elif liked:
+            value, condition = like, f" AND NOT {exists}"
+        else:
+            value, condition = unlike, f" AND {exists}"
+        # In RETURNING, the EXISTS still sees the like row as it was.
+        sql = (
+            f"UPDATE {qn(post.db_table)} SET {count} = {value}, "
+            f"{qn(post.get_field('updated_at').column)} = %s "
+            f"WHERE {qn(post.pk.column)} = %s{condition} "
+            f"RETURNING {count}, {exists}"
+        )
+        exists_params = [pk, user.pk]
+        params = [
+            *(exists_params if liked is None else []),
+            connection.ops.adapt_datetimefield_value(timezone.now()),
+            pk,
+            *(exists_params if liked is not None else []),
+            *exists_params,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        return None if row is None else (row[0], bool(row[1]))
+
 
 class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed by the (author, -published_date, -id) index below.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     published_date = models.DateTimeField(auto_now_add=True)
+    # Last change to the post or to its likes/comments; used as a validator
+    # for conditional requests.
+    updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(User, related_name="liked_posts", blank=True)
+    # Denormalized counters, maintained with F() updates so that listing posts
+    # never has to count the like or comment rows.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ("likes_count", "comments_count")
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the post feed.
+            models.Index(
+                fields=["-published_date", "-id"], name="post_published_id_idx"
+            ),
+            # Per-author listings (admin author filter, user cascades).
+            models.Index(
+                fields=["author", "-published_date", "-id"],
+                name="post_author_published_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def embedded_comments(self):
+        """Comments to embed in API output: the limited prefetch if there is one."""
+        if hasattr(self, "recent_comments"):
+            return self.recent_comments
+        return self.comments.all()
+
+    def save(self, *args, **kwargs):
+        # Never write back a stale copy of the counters over concurrent F() updates.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+def _subtract_comments(per_post, using):
+    """Take ``per_post[post_id]`` comments off each post's ``comments_count``."""
+    if not per_post:
+        return
+    removed = Case(*(When(pk=pk, then=Value(n)) for pk, n in per_post.items()))
+    Post.objects.using(using).filter(pk__in=per_post).update(
+        comments_count=Greatest(F("comments_count") - removed, 0), updated_at=Now()
+    )
+
+
+class CommentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Insert comments in bulk and bump each post's ``comments_count`` once."""
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            per_post = Counter(comment.post_id for comment in created)
+            for post_id, count in per_post.items():
+                Post.objects.using(self.db).filter(pk=post_id).update(
+                    comments_count=F("comments_count") + count, updated_at=Now()
+                )
+            for comment in created:
+                if comment.pk is not None:
+                    events.comment_created(comment)
+        return created
+
+    def delete(self):
+        """Delete the comments and take them off their posts' ``comments_count``."""
+        with transaction.atomic(using=self.db):
+            rows = list(self.order_by().values_list("post_id", "pk"))
+            result = super().delete()
+            _subtract_comments(Counter(post_id for post_id, _ in rows), self.db)
+            for post_id, pk in rows:
+                events.comment_deleted(post_id, pk)
+        return result
+
 
 class Comment(models.Model):
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Both foreign keys are covered by the composite indexes below, whose
+    # leading column makes a separate single-column index redundant.
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="comments", db_index=False
+    )
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     text = models.TextField()
     created_date = models.DateTimeField(default=timezone.now)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the comments under a post.
+            models.Index(
+                fields=["post", "-created_date", "-id"],
+                name="comment_post_created_id_idx",
+            ),
+            # Admin changelist ordering, date filter and author filter.
+            models.Index(
+                fields=["-created_date", "-id"], name="comment_created_id_idx"
+            ),
+            models.Index(
+                fields=["author", "-created_date", "-id"],
+                name="comment_author_created_id_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Post.objects.filter(pk=self.post_id).update(
+                    comments_count=F("comments_count") + 1, updated_at=Now()
+                )
+                events.comment_created(self)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Post.objects.filter(pk=self.post_id, comments_count__gt=0).update(
+                comments_count=F("comments_count") - 1, updated_at=Now()
+            )
+            events.comment_deleted(self.post_id, pk)
+        return result
+
+
+@receiver(pre_delete, sender=User)
+def _uncount_user(sender, instance, using, **kwargs):
+    """
+    Take a deleted user's likes and comments off the counters of the posts
+    they are on. The rows themselves go in the cascade, which bypasses
+    ``CommentQuerySet.delete()``; the user's own posts go with them.
+    """
+    others = Post.objects.using(using).exclude(author_id=instance.pk)
+    liked = Post.likes.through.objects.using(using).filter(user_id=instance.pk)
+    others.filter(pk__in=liked.values("post_id")).update(
+        likes_count=Greatest(F("likes_count") - 1, 0), updated_at=Now()
+    )
+    per_post = (
+        Comment.objects.using(using)
+        .filter(author_id=instance.pk, post__in=others)
+        .order_by()
+        .values_list("post_id")
+        .annotate(n=Count("*"))
+    )
+    _subtract_comments(dict(per_post), using)
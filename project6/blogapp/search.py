@@ -0,0 +1,251 @@
+"""
+Full-text search over posts and comments.
+
+Two backends share one interface and are picked from the database vendor:
+
+* SQLite keeps an FTS5 table, ``blogapp_search``, in sync with triggers on
+  ``blogapp_post`` and ``blogapp_comment``, so every write path (``save()``,
+  ``bulk_create()``, queryset deletes, raw SQL) updates the index. A row's
+  ``rowid`` is ``2 * id`` for posts and ``2 * id + 1`` for comments, so the
+  triggers replace or delete index rows by primary key. A migration that makes
+  Django rebuild either table on SQLite drops its triggers and has to create
+  them again.
+* PostgreSQL matches against expression GIN indexes on the weighted
+  ``tsvector`` of each table, which the database maintains by itself.
+
+Both are created by migration ``0007_full_text_search``. Results are ranked
+(title matches weigh more than body matches), lazily paginated and carry an
+HTML-escaped snippet with the matched terms wrapped in ``<mark>``.
+"""
+
+import html
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+# Control characters never appear in the escaped snippet, so they can mark the
+# matched terms until the text has been escaped.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+ELLIPSIS = "…"
+SNIPPET_WORDS = 16
+
+_TERM = re.compile(r"\w+")
+
+
+def highlight(snippet):
+    """Escape ``snippet`` and turn the backend's match markers into ``<mark>``."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+class SearchResults:
+    """
+    Ranked hits of one query, fetched a page at a time.
+
+    Supports ``count()`` and slicing so that Django's ``Paginator`` (and with it
+    DRF's page-number pagination) can page through it without loading every hit.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError("SearchResults only support slicing without a step.")
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        if stop <= start:
+            return []
+        return self.backend.fetch(self.query, start, stop - start)
+
+
+class SQLiteSearchBackend:
+    table = "blogapp_search"
+    # bm25() weights for the (title, body) columns.
+    weights = (10.0, 1.0)
+
+    def parse(self, text):
+        """Quote every word so user input can never be read as FTS5 syntax."""
+        return " ".join(f'"{term}"' for term in _TERM.findall(text))
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s",
+                [query],
+            )
+            return cursor.fetchone()[0]
+
+    def fetch(self, query, offset, limit):
+        sql = f"""
+            SELECT {self.table}.rowid, {self.table}.post_id, p.title,
+                   snippet({self.table}, -1, %s, %s, %s, {SNIPPET_WORDS}),
+                   bm25({self.table}, {self.weights[0]}, {self.weights[1]}) AS rank
+            FROM {self.table}
+            INNER JOIN blogapp_post p ON p.id = {self.table}.post_id
+            WHERE {self.table} MATCH %s
+            ORDER BY rank, {self.table}.rowid DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [MATCH_START, MATCH_END, ELLIPSIS, query, limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {
+                "type": "comment" if rowid & 1 else "post",
+                "id": rowid >> 1,
+                "post_id": post_id,
+                "title": title,
+                "snippet": highlight(snippet),
+                # bm25() is lower-is-better; flip it so higher ranks first.
+                "rank": round(-rank, 6),
+            }
+            for rowid, post_id, title, snippet, rank in rows
+        ]
+
+    def filter(self, queryset, query):
+        """Restrict a Post or Comment queryset to the rows matching ``query``."""
+        parity = 0 if queryset.model._meta.model_name == "post" else 1
+        subquery = RawSQL(
+            f"SELECT rowid >> 1 FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND (rowid & 1) = %s",
+            [query, parity],
+        )
+        return queryset.filter(pk__in=subquery)
+
+
+class PostgreSQLSearchBackend:
+    config = "english"
+    # Must match the expression indexes created by 0007_full_text_search.
+    vectors = {
+        "post": (
+            "setweight(to_tsvector('english', coalesce({alias}.title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce({alias}.content, '')), 'B')"
+        ),
+        "comment": "to_tsvector('english', coalesce({alias}.text, ''))",
+    }
+    headline_options = (
+        f"'StartSel=' || chr(2) || ', StopSel=' || chr(3) || "
+        f"', MaxWords={SNIPPET_WORDS}, MinWords=5, MaxFragments=1'"
+    )
+
+    def parse(self, text):
+        # websearch_to_tsquery() accepts arbitrary input; only reject queries
+        # without a single word.
+        return text.strip() if _TERM.search(text) else ""
+
+    def _hits_sql(self):
+        post_vector = self.vectors["post"].format(alias="p")
+        comment_vector = self.vectors["comment"].format(alias="c")
+        return f"""
+            SELECT 'post' AS type, p.id, p.id AS post_id, p.title,
+                   p.content AS body, ts_rank({post_vector}, q.query) AS rank
+            FROM blogapp_post p, q
+            WHERE {post_vector} @@ q.query
+            UNION ALL
+            SELECT 'comment', c.id, c.post_id, p.title,
+                   c.text, ts_rank({comment_vector}, q.query)
+            FROM blogapp_comment c
+            INNER JOIN blogapp_post p ON p.id = c.post_id, q
+            WHERE {comment_vector} @@ q.query
+        """
+
+    def _with_query(self):
+        return f"WITH q AS (SELECT websearch_to_tsquery('{self.config}', %s) AS query)"
+
+    def count(self, query):
+        sql = f"{self._with_query()} SELECT COUNT(*) FROM ({self._hits_sql()}) hits"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [query])
+            return cursor.fetchone()[0]
+
+    def fetch(self, query, offset, limit):
+        # Headlines are computed for the page only, not for every match.
+        sql = f"""
+            {self._with_query()}
+            SELECT page.type, page.id, page.post_id, page.title,
+                   ts_headline('{self.config}', page.body, q.query,
+                               {self.headline_options}),
+                   page.rank
+            FROM (
+                SELECT * FROM ({self._hits_sql()}) hits
+                ORDER BY rank DESC, id DESC
+                LIMIT %s OFFSET %s
+            ) page, q
+            ORDER BY page.rank DESC, page.id DESC
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [query, limit, offset])
+            rows = cursor.fetchall()
+        return [
+            {
+                "type": kind,
+                "id": pk,
+                "post_id": post_id,
+                "title": title,
+                "snippet": highlight(snippet),
+                "rank": round(rank, 6),
+            }
+            for kind, pk, post_id, title, snippet, rank in rows
+        ]
+
+    def filter(self, queryset, query):
+        """Restrict a Post or Comment queryset to the rows matching ``query``."""
+        opts = queryset.model._meta
+        vector = self.vectors[opts.model_name].format(alias=opts.db_table)
+        subquery = RawSQL(
+            f"SELECT id FROM {opts.db_table} "
+            f"WHERE {vector} @@ websearch_to_tsquery('{self.config}', %s)",
+            [query],
+        )
+        return queryset.filter(pk__in=subquery)
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgreSQLSearchBackend,
+}
+
+
+def get_backend():
+    try:
+        return BACKENDS[connection.vendor]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Full-text search is not available on {connection.vendor}."
+        )
+
+
+def search(text):
+    """
+    Return the ranked ``SearchResults`` of ``text``, or None if it contains no
+    searchable word.
+    """
+    backend = get_backend()
+    query = backend.parse(text)
+    if not query:
+        return None
+    return SearchResults(backend, query)
+
+
+def filter_queryset(queryset, text):
+    """Restrict a Post or Comment queryset to the rows matching ``text``."""
+    backend = get_backend()
+    query = backend.parse(text)
+    if not query:
+        return queryset.none()
+    return backend.filter(queryset, query)
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .metrics import TimedSerializerMixin
 from .models import Post, Comment
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -10,10 +12,17 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ["id", "author", "text", "created_date"]
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
-    likes_count = serializers.IntegerField(source="likes.count", read_only=True)
+    comments = CommentSerializer(many=True, read_only=True, source="embedded_comments")
+
+    def __init__(self, *args, **kwargs):
+        # ``fields`` limits the output to a subset of Meta.fields.
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta:
         model = Post
@@ -24,5 +33,38 @@ class PostSerializer(serializers.ModelSerializer):
             "author",
             "published_date",
             "likes_count",
+            "comments_count",
             "comments",
         ]
+
+
+class PostBulkDeleteSerializer(serializers.Serializer):
+    """Query parameters selecting the posts removed by a bulk delete."""
+
+    ids = serializers.CharField(required=False)
+    author = serializers.CharField(required=False)
+    published_before = serializers.DateTimeField(required=False)
+    published_after = serializers.DateTimeField(required=False)
+
+    def validate_ids(self, value):
+        try:
+            return [int(pk) for pk in value.split(",") if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError("Must be a comma-separated list of ids.")
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("At least one filter is required.")
+        return attrs
+
+
+class BlogTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token pair carrying the claims ``StatelessJWTAuthentication`` reads."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["username"] = user.get_username()
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        return token
@@ -0,0 +1,38 @@
+"""
+WhiteNoise that does not force the middleware above it to run in a thread.
+
+Django runs a middleware that both modes support in the mode of the one below
+it, so a single sync-only middleware turns everything above it sync under
+ASGI: the health and metrics middleware would then answer every request from
+a worker thread. This ``WhiteNoiseMiddleware`` is async-capable; under ASGI it
+looks static paths up on the event loop and only opens and serves a matching
+file in a thread. Under WSGI it is WhiteNoise's own middleware.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise import middleware
+
+
+class WhiteNoiseMiddleware(middleware.WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -1,14 +1,49 @@
 # Create your tests here.
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
+from . import events, export, health, metrics, throttling
+from .authentication import CachedJWTAuthentication, StatelessJWTAuthentication
+from .deletion import ChunkedPostDeleter
 from .models import Post, Comment
+from .pagination import EstimatedCountPaginator, estimate_count
+from .serializers import PostSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import JsonResponse
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+import asyncio
+import csv
+import functools
+import json
+import re
+import tempfile
+import threading
+import time
 
 
-class PostAPITest(APITestCase):
+class BlogAPITestCase(APITestCase):
+    """API test case that starts every test with empty caches and full buckets."""
+
+    def setUp(self):
+        caches[settings.BLOG_RESPONSE_CACHE_ALIAS].clear()
+        throttling.limiter.clear()
+
+
+class PostAPITest(BlogAPITestCase):
     def setUp(self):
+        super().setUp()
         self.user = User.objects.create_user(username="test", password="pass")
         self.other_user = User.objects.create_user(username="other", password="pass")
         refresh = RefreshToken.for_user(self.user)
@@ -125,10 +160,11 @@ class PostAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class CommentModelTest(APITestCase):
+class CommentModelTest(BlogAPITestCase):
     """Test cases for Comment model."""
 
     def setUp(self):
+        super().setUp()
         self.user = User.objects.create_user(username="testuser", password="testpass")
         self.post = Post.objects.create(
             title="Test Post", content="Test Content", author=self.user
@@ -148,10 +184,11 @@ class CommentModelTest(APITestCase):
         self.assertEqual(self.comment.text, "Test comment")
 
 
-class CommentAPITest(APITestCase):
+class CommentAPITest(BlogAPITestCase):
     """Test cases for Comment API endpoints."""
 
     def setUp(self):
+        super().setUp()
         self.user = User.objects.create_user(username="test", password="pass")
         self.other_user = User.objects.create_user(username="other", password="pass")
         refresh = RefreshToken.for_user(self.user)
@@ -202,3 +239,1968 @@ class CommentAPITest(APITestCase):
         data = {"text": "Comment"}
         response = self.client.post(invalid_url, data)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(BLOG_RESPONSE_CACHE_TIMEOUT=0)
+class PostQueryCountTest(BlogAPITestCase):
+    """The post list/detail endpoints must not issue per-row queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.post_url = reverse("post-list-create")
+
+    def _create_posts(self, count, comments_per_post):
+        start = Post.objects.count()
+        for i in range(start, start + count):
+            post = Post.objects.create(
+                title=f"Post {i}", content="Content", author=self.user
+            )
+            commenter = User.objects.create_user(username=f"commenter{i}")
+            Post.objects.like(post.pk, self.user)
+            Post.objects.like(post.pk, commenter)
+            for j in range(comments_per_post):
+                Comment.objects.create(post=post, author=commenter, text=f"c{j}")
+        return post
+
+    def test_list_query_count_is_constant(self):
+        self._create_posts(2, 1)
+        # count + posts (with author join) + prefetched comments
+        with self.assertNumQueries(3):
+            response = self.client.get(self.post_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self._create_posts(8, 5)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.post_url)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(response.data["results"][0]["likes_count"], 2)
+        self.assertEqual(len(response.data["results"][0]["comments"]), 5)
+
+    def test_detail_query_count_is_constant(self):
+        post = self._create_posts(1, 20)
+        # conditional-request validator + post (with author join) + comments
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("post-detail", args=[post.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["likes_count"], 2)
+        self.assertEqual(response.data["author"], self.user.username)
+        self.assertEqual(len(response.data["comments"]), 20)
+
+
+class CursorPaginationTest(BlogAPITestCase):
+    """Keyset pagination mode for the post and comment lists."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.post_url = reverse("post-list-create")
+
+    def _walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            seen.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        return seen
+
+    def test_post_cursor_walks_every_post_once(self):
+        posts = [
+            Post.objects.create(title=f"Post {i}", content="C", author=self.user)
+            for i in range(7)
+        ]
+        # Force ties on published_date so the id tie-breaker is exercised.
+        Post.objects.filter(pk__in=[p.pk for p in posts[:4]]).update(
+            published_date=posts[0].published_date
+        )
+        expected = list(
+            Post.objects.order_by("-published_date", "-id").values_list("id", flat=True)
+        )
+        seen = self._walk(f"{self.post_url}?pagination=cursor&page_size=3")
+        self.assertEqual(seen, expected)
+
+    def test_post_cursor_does_not_count(self):
+        for i in range(3):
+            Post.objects.create(title=f"Post {i}", content="C", author=self.user)
+        # posts page + prefetched comments, no COUNT(*)
+        with self.assertNumQueries(2):
+            self.client.get(f"{self.post_url}?pagination=cursor")
+
+    def test_comment_cursor_pagination(self):
+        post = Post.objects.create(title="Post", content="C", author=self.user)
+        comments = [
+            Comment.objects.create(post=post, author=self.user, text=f"c{i}")
+            for i in range(5)
+        ]
+        url = reverse("comment-list-create", args=[post.pk])
+        seen = self._walk(f"{url}?pagination=cursor&page_size=2")
+        self.assertEqual(seen, [c.pk for c in reversed(comments)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.post_url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_default_mode_is_unchanged(self):
+        post = Post.objects.create(title="Post", content="C", author=self.user)
+        response = self.client.get(self.post_url)
+        self.assertIn("count", response.data)
+        url = reverse("comment-list-create", args=[post.pk])
+        self.assertEqual(self.client.get(url).data, [])
+
+
+class PostCounterTest(BlogAPITestCase):
+    """Stored like/comment counters stay in step with the underlying rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.user
+        )
+
+    def test_like_toggle_maintains_likes_count(self):
+        like_url = reverse("post-like-toggle", args=[self.post.pk])
+        self.client.post(like_url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.client.post(like_url)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comments_maintain_comments_count(self):
+        url = reverse("comment-list-create", args=[self.post.pk])
+        response = self.client.post(url, {"text": "First"})
+        self.client.post(url, {"text": "Second"})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+
+        self.client.delete(
+            reverse("comment-destroy", args=[self.post.pk, response.data["id"]])
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_update_does_not_overwrite_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.objects.like(self.post.pk, self.user)
+        stale.title = "Renamed"
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "Renamed")
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_queryset_delete_maintains_comments_count(self):
+        other = Post.objects.create(title="Other", content="C", author=self.user)
+        for post in (self.post, self.post, other):
+            Comment.objects.create(post=post, author=self.user, text="c")
+        Comment.objects.filter(post__in=[self.post, other]).exclude(
+            pk=Comment.objects.latest("pk").pk
+        ).delete()
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.comments_count, other.comments_count), (0, 1))
+        self.assertEqual(Post.objects.reconcile_counters(), 0)
+
+    def test_admin_delete_selected_maintains_comments_count(self):
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        self.client.force_login(admin)
+        comments = [
+            Comment.objects.create(post=self.post, author=admin, text=text)
+            for text in ("a", "b", "c")
+        ]
+        self.client.post(
+            reverse("admin:blogapp_comment_changelist"),
+            {
+                "action": "delete_selected",
+                "_selected_action": [comment.pk for comment in comments[:2]],
+                "post": "yes",
+            },
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_deleting_a_user_maintains_counters(self):
+        reader = User.objects.create_user(username="reader")
+        Post.objects.like(self.post.pk, reader)
+        Post.objects.like(self.post.pk, self.user)
+        own = Post.objects.create(title="Own", content="C", author=reader)
+        for post in (self.post, self.post, own):
+            Comment.objects.create(post=post, author=reader, text="c")
+        Comment.objects.create(post=self.post, author=self.user, text="c")
+        reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertEqual(Post.objects.reconcile_counters(), 0)
+
+    def test_admin_form_does_not_edit_likes(self):
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:blogapp_post_change", args=[self.post.pk])
+        )
+        self.assertNotIn("likes", response.context["adminform"].form.fields)
+
+    def test_reconcile_command_fixes_drift(self):
+        other = Post.objects.create(title="Other", content="C", author=self.user)
+        self.post.likes.add(self.user)  # bypasses the counter
+        for text in ("a", "b", "c"):
+            Comment.objects.create(post=self.post, author=self.user, text=text)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7)
+        out = StringIO()
+        call_command("reconcile_post_counters", "--batch-size=1", stdout=out)
+        self.assertIn("Checked 2 posts, fixed 1 counters.", out.getvalue())
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 3))
+        self.assertEqual((other.likes_count, other.comments_count), (0, 0))
+
+
+class PostLikeTest(BlogAPITestCase):
+    """Explicit like/unlike semantics of PostLikeToggle."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.user
+        )
+        self.like_url = reverse("post-like-toggle", args=[self.post.pk])
+
+    def test_put_is_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.like_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        self.assertEqual(self.post.likes.count(), 1)
+
+    def test_delete_is_idempotent(self):
+        self.client.put(self.like_url)
+        for _ in range(2):
+            response = self.client.delete(self.like_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {"liked": False, "likes_count": 0})
+        self.assertEqual(self.post.likes.count(), 0)
+
+    def test_like_missing_post(self):
+        url = reverse("post-like-toggle", args=[999])
+        for method in (self.client.post, self.client.put, self.client.delete):
+            self.assertEqual(method(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_like_statement_count(self):
+        user = self.user
+        # savepoint + counter UPDATE ... RETURNING + like INSERT + release
+        with self.assertNumQueries(4):
+            self.assertTrue(Post.objects.like(self.post.pk, user))
+        # savepoint + counter UPDATE ... RETURNING + like DELETE + release
+        with self.assertNumQueries(4):
+            self.assertTrue(Post.objects.unlike(self.post.pk, user))
+        # An unlike that changes nothing writes nothing: the UPDATE matches no
+        # row, then one SELECT reads the post.
+        with self.assertNumQueries(4):
+            self.assertFalse(Post.objects.unlike(self.post.pk, user))
+
+    def test_toggle_statement_count(self):
+        user = self.user
+        # savepoint + counter UPDATE ... RETURNING + like INSERT + release
+        with self.assertNumQueries(4):
+            self.assertTrue(Post.objects.toggle_like(self.post.pk, user))
+        # savepoint + counter UPDATE ... RETURNING + like DELETE + release
+        with self.assertNumQueries(4):
+            self.assertFalse(Post.objects.toggle_like(self.post.pk, user))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        with self.assertRaises(Post.DoesNotExist):
+            Post.objects.toggle_like(999, user)
+        self.assertFalse(Post.likes.through.objects.exists())
+
+    def test_set_like_returns_the_count(self):
+        other = User.objects.create_user(username="other", password="pass")
+        Post.objects.like(self.post.pk, other)
+        self.assertEqual(
+            Post.objects.set_like(self.post.pk, self.user), (True, True, 2)
+        )
+        self.assertEqual(
+            Post.objects.set_like(self.post.pk, self.user, True), (True, False, 2)
+        )
+        self.assertEqual(
+            Post.objects.set_like(self.post.pk, self.user, False), (False, True, 1)
+        )
+        with self.assertRaises(Post.DoesNotExist):
+            Post.objects.set_like(999, self.user, True)
+
+    def test_like_request_reads_nothing_after_the_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.like_url)
+        self.assertEqual(response.data, {"liked": True, "likes_count": 1})
+        sql = [query["sql"] for query in queries]
+        last_write = max(i for i, q in enumerate(sql) if q.startswith("INSERT"))
+        self.assertFalse([q for q in sql[last_write + 1 :] if q.startswith("SELECT")])
+
+
+class PostLikeConcurrencyTest(TransactionTestCase):
+    """Many threads liking and unliking the same post at once."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.users = [User.objects.create_user(username=f"u{i}") for i in range(8)]
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.author
+        )
+
+    def _hammer(self, action, users, repeat):
+        errors = []
+
+        def worker(user):
+            try:
+                for _ in range(repeat):
+                    action(self.post.pk, user)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_likes_are_counted_once(self):
+        # Every user "double-clicks" several times from several threads.
+        self._hammer(Post.objects.like, self.users * 3, repeat=5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes.count(), len(self.users))
+        self.assertEqual(self.post.likes_count, len(self.users))
+
+        self._hammer(Post.objects.unlike, self.users[:5] * 3, repeat=5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes.count(), 3)
+        self.assertEqual(self.post.likes_count, 3)
+
+    def test_concurrent_toggles_keep_the_counter_in_step(self):
+        # Users toggle from two threads each; whatever state they end in,
+        # the counter must match the like rows.
+        self._hammer(Post.objects.toggle_like, self.users * 2, repeat=3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, self.post.likes.count())
+
+
+class ResponseCacheTest(BlogAPITestCase):
+    """Cached post list/detail responses and their invalidation."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.user
+        )
+        self.list_url = reverse("post-list-create")
+        self.detail_url = reverse("post-detail", args=[self.post.pk])
+
+    def _authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+
+    def test_repeated_get_is_served_from_cache(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        # Only the conditional-request validator touches the database.
+        with self.assertNumQueries(1):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get(self.list_url)
+        self.assertEqual(
+            self.client.get(f"{self.list_url}?page_size=5")["X-Cache"], "MISS"
+        )
+        self.assertEqual(
+            self.client.get(f"{self.list_url}?page_size=5")["X-Cache"], "HIT"
+        )
+
+    def test_update_invalidates_detail_and_list(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self._authenticate(self.user)
+        self.client.put(self.detail_url, {"title": "Renamed", "content": "C"})
+        self.client.credentials()
+
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(detail["X-Cache"], "MISS")
+        self.assertEqual(detail.data["title"], "Renamed")
+        self.assertEqual(self.client.get(self.list_url)["X-Cache"], "MISS")
+
+    def test_writes_only_invalidate_the_affected_post(self):
+        other = Post.objects.create(title="Other", content="C", author=self.user)
+        other_url = reverse("post-detail", args=[other.pk])
+        self.client.get(other_url)
+
+        self._authenticate(self.user)
+        self.client.post(reverse("post-like-toggle", args=[self.post.pk]))
+        self.client.post(
+            reverse("comment-list-create", args=[self.post.pk]), {"text": "Hi"}
+        )
+        self.client.credentials()
+
+        self.assertEqual(self.client.get(other_url)["X-Cache"], "HIT")
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(detail.data["likes_count"], 1)
+        self.assertEqual(detail.data["comments_count"], 1)
+
+    @override_settings(BLOG_DELETE_JOBS_ASYNC=False)
+    def test_delete_all_invalidates_everything(self):
+        self.client.get(self.detail_url)
+        self._authenticate(self.admin)
+        self.client.delete(reverse("post-delete-all"))
+        self.client.credentials()
+        self.assertEqual(
+            self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+    def test_admin_writes_invalidate_the_affected_posts(self):
+        other = Post.objects.create(title="Other", content="C", author=self.user)
+        other_url = reverse("post-detail", args=[other.pk])
+        self.client.force_login(self.admin)
+
+        self.client.get(self.detail_url)
+        self.client.get(other_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:blogapp_post_change", args=[self.post.pk]),
+                {
+                    "title": "Renamed",
+                    "content": "Content",
+                    "author": self.user.pk,
+                    "published_date_0": "2024-01-01",
+                    "published_date_1": "00:00:00",
+                },
+            )
+        self.assertEqual(self.client.get(self.detail_url).data["title"], "Renamed")
+        self.assertEqual(self.client.get(other_url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:blogapp_comment_add"),
+                {"post": self.post.pk, "author": self.user.pk, "text": "Hi"},
+            )
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "MISS")
+
+        self.client.get(self.list_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:blogapp_post_changelist"),
+                {
+                    "action": "delete_selected",
+                    "_selected_action": [other.pk],
+                    "post": "yes",
+                },
+            )
+        self.assertEqual(
+            self.client.get(other_url).status_code, status.HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(self.client.get(self.list_url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.detail_url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:blogapp_post_delete", args=[self.post.pk]),
+                {"post": "yes"},
+            )
+        self.assertEqual(
+            self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+    def test_stats(self):
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        self._authenticate(self.admin)
+        response = self.client.get(reverse("response-cache-stats"))
+        self.assertEqual(response.data, {"hits": 2, "misses": 1})
+
+        self._authenticate(self.user)
+        response = self.client.get(reverse("response-cache-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ConditionalRequestTest(BlogAPITestCase):
+    """ETag / Last-Modified handling for posts and comments."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.user
+        )
+        self.detail_url = reverse("post-detail", args=[self.post.pk])
+        self.comments_url = reverse("comment-list-create", args=[self.post.pk])
+
+    def test_detail_not_modified(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        # The validator query is all it takes; nothing is serialized.
+        with self.assertNumQueries(1):  # JWT user comes from the cache
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)["Last-Modified"]
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_with_likes_and_comments(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.client.put(reverse("post-like-toggle", args=[self.post.pk]))
+        liked = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(liked.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(liked["ETag"], etag)
+
+        self.client.post(self.comments_url, {"text": "Hi"})
+        commented = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=liked["ETag"])
+        self.assertEqual(commented.status_code, status.HTTP_200_OK)
+
+    def test_comment_list_not_modified(self):
+        self.client.post(self.comments_url, {"text": "Hi"})
+        etag = self.client.get(self.comments_url)["ETag"]
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        comment = Comment.objects.get()
+        self.client.delete(reverse("comment-destroy", args=[self.post.pk, comment.pk]))
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_put_if_match(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        data = {"title": "First", "content": "C"}
+        response = self.client.put(self.detail_url, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # A second writer still holding the old ETag loses.
+        data = {"title": "Second", "content": "C"}
+        response = self.client.put(self.detail_url, data, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "First")
+
+
+@override_settings(BLOG_RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsTest(BlogAPITestCase):
+    """?fields=, ?expand=comments and ?comments_limit= on the post endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.user
+        )
+        for i in range(5):
+            Comment.objects.create(post=self.post, author=self.user, text=f"c{i}")
+        self.list_url = reverse("post-list-create")
+        self.detail_url = reverse("post-detail", args=[self.post.pk])
+
+    def test_lean_list_skips_comment_prefetch(self):
+        # count + posts (with author join), no comment query
+        with self.assertNumQueries(2):
+            response = self.client.get(f"{self.list_url}?fields=id,title,author")
+        self.assertEqual(
+            response.data["results"][0],
+            {"id": self.post.pk, "title": "Post", "author": "test"},
+        )
+
+    def test_unrequested_columns_are_deferred(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{self.detail_url}?fields=id,title")
+        self.assertEqual(response.data, {"id": self.post.pk, "title": "Post"})
+        post_query = queries.captured_queries[-1]["sql"]
+        self.assertIn('"title"', post_query)
+        self.assertNotIn('"content"', post_query)
+        self.assertNotIn("auth_user", post_query)
+
+    def test_expand_comments_with_limit(self):
+        response = self.client.get(
+            f"{self.detail_url}?fields=id&expand=comments&comments_limit=2"
+        )
+        self.assertEqual(set(response.data), {"id", "comments"})
+        self.assertEqual([c["text"] for c in response.data["comments"]], ["c4", "c3"])
+
+    def test_comments_limit_without_fields(self):
+        response = self.client.get(f"{self.list_url}?comments_limit=1")
+        post = response.data["results"][0]
+        self.assertEqual(len(post["comments"]), 1)
+        self.assertEqual(post["comments_count"], 5)
+
+    def test_unknown_field(self):
+        response = self.client.get(f"{self.list_url}?fields=id,secret")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("secret", str(response.data["fields"]))
+
+    def test_full_representation_by_default(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(set(response.data), set(PostSerializer.Meta.fields))
+
+
+class BulkEndpointTest(BlogAPITestCase):
+    """Bulk creation of posts/comments and filtered bulk deletion of posts."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.other_user = User.objects.create_user(username="other", password="pass")
+        self._authenticate(self.user)
+        self.bulk_url = reverse("post-bulk")
+
+    def _authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+
+    def test_bulk_create_posts(self):
+        items = [{"title": f"Post {i}", "content": "C"} for i in range(250)]
+        # JWT user lookup + savepoint/release + one INSERT per 100-row chunk
+        with self.assertNumQueries(6):
+            response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 250)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 250)
+        ids = [result["id"] for result in response.data["results"]]
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids).values_list("title", flat=True)),
+            [item["title"] for item in items],
+        )
+
+    def test_bulk_create_reports_invalid_items(self):
+        items = [{"title": "Good", "content": "C"}, {"content": "No title"}, "junk"]
+        response = self.client.post(self.bulk_url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 2))
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, [201, 400, 400])
+        self.assertIn("title", response.data["results"][1]["errors"])
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(
+            self.bulk_url, {"title": "T", "content": "C"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_comments_updates_counter(self):
+        post = Post.objects.create(title="Post", content="C", author=self.user)
+        url = reverse("comment-bulk-create", args=[post.pk])
+        items = [{"text": f"c{i}"} for i in range(5)] + [{"text": ""}]
+        response = self.client.post(url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 5)
+        self.assertEqual(post.comments.filter(author=self.user).count(), 5)
+
+    def test_bulk_create_comments_missing_post(self):
+        url = reverse("comment-bulk-create", args=[999])
+        response = self.client.post(url, [{"text": "x"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_delete_is_scoped_to_own_posts(self):
+        mine = [
+            Post.objects.create(title=f"Mine {i}", content="C", author=self.user)
+            for i in range(3)
+        ]
+        theirs = Post.objects.create(
+            title="Theirs", content="C", author=self.other_user
+        )
+        Comment.objects.create(post=mine[0], author=self.other_user, text="x")
+        Post.objects.like(mine[1].pk, self.other_user)
+        Post.objects.like(theirs.pk, self.user)
+        ids = ",".join(str(post.pk) for post in [mine[0], mine[1], theirs])
+        response = self.client.delete(f"{self.bulk_url}?ids={ids}")
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(
+            set(Post.objects.values_list("pk", flat=True)), {mine[2].pk, theirs.pk}
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            list(Post.likes.through.objects.values_list("post_id", flat=True)),
+            [theirs.pk],
+        )
+
+    def test_bulk_delete_by_date_as_admin(self):
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        old = Post.objects.create(title="Old", content="C", author=self.other_user)
+        Post.objects.filter(pk=old.pk).update(published_date="2020-01-01T00:00Z")
+        new = Post.objects.create(title="New", content="C", author=self.other_user)
+        self._authenticate(admin)
+        response = self.client.delete(
+            f"{self.bulk_url}?author=other&published_before=2021-01-01T00:00Z"
+        )
+        self.assertEqual(response.data, {"deleted": 1})
+        self.assertEqual(list(Post.objects.values_list("pk", flat=True)), [new.pk])
+
+    def test_bulk_delete_requires_a_filter(self):
+        Post.objects.create(title="Post", content="C", author=self.user)
+        response = self.client.delete(self.bulk_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_unauthenticated_bulk(self):
+        self.client.credentials()
+        response = self.client.post(self.bulk_url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(BLOG_DELETE_JOBS_ASYNC=False)
+class PostDeleteAllTest(BlogAPITestCase):
+    """Chunked deletion of every post through the API and the command."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        for i in range(5):
+            post = Post.objects.create(title=f"P{i}", content="C", author=self.user)
+            Post.objects.like(post.pk, self.user)
+            for j in range(3):
+                Comment.objects.create(post=post, author=self.user, text=f"c{j}")
+        self.url = reverse("post-delete-all")
+
+    def _authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+
+    def test_delete_all_returns_job(self):
+        self._authenticate(self.admin)
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual(response.data["total_posts"], 5)
+        self.assertEqual(
+            response.data["deleted"], {"posts": 5, "comments": 15, "likes": 5}
+        )
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Post.likes.through.objects.exists())
+
+        job = self.client.get(response.data["status_url"])
+        self.assertEqual(job.status_code, status.HTTP_200_OK)
+        self.assertEqual(job.data["job_id"], response.data["job_id"])
+        self.assertEqual(job.data["status"], "done")
+
+    def test_unknown_job(self):
+        self._authenticate(self.admin)
+        url = reverse("post-delete-job", args=["missing"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_all_requires_admin(self):
+        self._authenticate(self.user)
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_command_deletes_in_chunks(self):
+        out = StringIO()
+        call_command("delete_all_posts", "--noinput", "--chunk-size=2", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "Deleted 2/5 posts, 6 comments, 2 likes")
+        self.assertEqual(len(lines), 4)  # three chunks + summary
+        self.assertIn("Deleted 5 posts, 15 comments and 5 likes.", lines[-1])
+        self.assertFalse(Post.objects.exists())
+
+    def test_chunks_never_exceed_chunk_size(self):
+        with CaptureQueriesContext(connection) as queries:
+            ChunkedPostDeleter(chunk_size=2).run()
+        deletes = [q["sql"] for q in queries if q["sql"].startswith("DELETE")]
+        self.assertTrue(deletes)
+        for sql in deletes:
+            in_list = re.search(r"IN \(([^)]*)\)", sql).group(1)
+            self.assertLessEqual(len(in_list.split(",")), 2, sql)
+
+
+class PostDeleteAllJobThreadTest(TransactionTestCase):
+    """The delete-all job runs in a background thread."""
+
+    def test_background_job_completes(self):
+        user = User.objects.create_user(username="test")
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        for i in range(3):
+            Post.objects.create(title=f"P{i}", content="C", author=user)
+        client = APIClient()
+        client.force_authenticate(admin)
+        status_url = client.delete(reverse("post-delete-all")).data["status_url"]
+
+        for _ in range(100):
+            job = client.get(status_url).data
+            if job["status"] != "running":
+                break
+            time.sleep(0.05)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["deleted"]["posts"], 3)
+        self.assertFalse(Post.objects.exists())
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite syntax")
+class QueryPlanTest(BlogAPITestCase):
+    """
+    Run ``EXPLAIN QUERY PLAN`` on the queries of the hot read paths and fail on
+    full table scans or temporary B-trees built to sort the result.
+    """
+
+    full_scan = re.compile(r"^SCAN (blogapp_\w+|auth_\w+)$")
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        self.user = User.objects.create_user(username="writer", password="pass")
+        for i in range(3):
+            post = Post.objects.create(
+                title=f"Post {i}", content="Body", author=self.user
+            )
+            Comment.objects.create(post=post, author=self.admin, text=f"Comment {i}")
+        self.post = post
+
+    def assertIndexedPlans(self, url, sorts_window=False):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            # COUNT(*) for the paginator has to visit every matching row.
+            if not sql.startswith("SELECT") or "blogapp_" not in sql:
+                continue
+            if "COUNT(*)" in sql:
+                continue
+            # The admin paginator's row estimate reads statistics, not tables.
+            if "sqlite_stat1" in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                details = [row[-1] for row in cursor.fetchall()]
+            for detail in details:
+                # A sliced prefetch filters on ROW_NUMBER() in a subquery and
+                # re-sorts its output, at most page_size * limit rows.
+                if not (sorts_window and "ROW_NUMBER()" in sql):
+                    self.assertNotIn("TEMP B-TREE", detail, f"{sql}\n{details}")
+                self.assertIsNone(self.full_scan.match(detail), f"{sql}\n{details}")
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_post_list(self):
+        self.assertIndexedPlans(reverse("post-list-create"))
+
+    def test_post_list_cursor(self):
+        self.assertIndexedPlans(reverse("post-list-create") + "?pagination=cursor")
+
+    def test_post_list_limited_comments(self):
+        self.assertIndexedPlans(
+            reverse("post-list-create") + "?expand=comments&comments_limit=2",
+            sorts_window=True,
+        )
+
+    def test_comment_list(self):
+        url = reverse("comment-list-create", args=[self.post.pk])
+        self.assertIndexedPlans(url)
+        self.assertIndexedPlans(url + "?pagination=cursor")
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        for name in (
+            "admin:blogapp_post_changelist",
+            "admin:blogapp_comment_changelist",
+        ):
+            url = reverse(name)
+            date_field = "published_date" if "post" in name else "created_date"
+            since = urlencode(
+                {f"{date_field}__gte": timezone.now() - timedelta(days=7)}
+            )
+            self.assertIndexedPlans(url)
+            self.assertIndexedPlans(f"{url}?author__id__exact={self.user.pk}")
+            self.assertIndexedPlans(f"{url}?{since}")
+
+
+@skipUnless(connection.vendor == "sqlite", "Exercises the SQLite FTS5 backend")
+class SearchTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="searcher", password="pass")
+        self.url = reverse("post-search")
+        self.django_post = Post.objects.create(
+            title="Django tips", content="Indexes make queries fast.", author=self.user
+        )
+        self.other_post = Post.objects.create(
+            title="Gardening",
+            content="Tomatoes like <b>sun</b> and django.",
+            author=self.user,
+        )
+        self.comment = Comment.objects.create(
+            post=self.other_post, author=self.user, text="Try pruning the tomatoes"
+        )
+
+    def hits(self, q):
+        response = self.client.get(self.url, {"q": q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(hit["type"], hit["id"]) for hit in response.data["results"]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(
+            self.hits("django"),
+            [("post", self.django_post.pk), ("post", self.other_post.pk)],
+        )
+
+    def test_comments_are_searched(self):
+        response = self.client.get(self.url, {"q": "pruning"})
+        [hit] = response.data["results"]
+        self.assertEqual(hit["type"], "comment")
+        self.assertEqual(hit["id"], self.comment.pk)
+        self.assertEqual(hit["post_id"], self.other_post.pk)
+        self.assertEqual(hit["title"], "Gardening")
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        response = self.client.get(self.url, {"q": "sun"})
+        snippet = response.data["results"][0]["snippet"]
+        self.assertIn("&lt;b&gt;<mark>sun</mark>&lt;/b&gt;", snippet)
+
+    def test_stemming_and_query_syntax_is_literal(self):
+        self.assertIn(("post", self.other_post.pk), self.hits("tomato"))
+        self.assertEqual(self.hits('tomatoes" OR NOT "x'), [])
+
+    def test_index_follows_writes(self):
+        self.django_post.title = "Python tips"
+        self.django_post.save()
+        self.assertNotIn(("post", self.django_post.pk), self.hits("django"))
+        self.assertIn(("post", self.django_post.pk), self.hits("python"))
+
+        self.comment.delete()
+        self.assertEqual(self.hits("pruning"), [])
+        Comment.objects.bulk_create(
+            [Comment(post=self.django_post, author=self.user, text="pruning again")]
+        )
+        self.assertEqual(len(self.hits("pruning")), 1)
+
+        ChunkedPostDeleter().run()
+        self.assertEqual(self.hits("tips"), [])
+        self.assertEqual(self.hits("pruning"), [])
+
+    def test_paginated(self):
+        for i in range(12):
+            Post.objects.create(title=f"Paged {i}", content="x", author=self.user)
+        response = self.client.get(self.url, {"q": "paged"})
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(len(response.data["results"]), 10)
+        second = self.client.get(response.data["next"])
+        self.assertEqual(len(second.data["results"]), 2)
+
+    def test_query_is_required(self):
+        response = self.client.get(self.url, {"q": " ?! "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(username="root", password="pass")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:blogapp_post_changelist"), {"q": "django"}
+        )
+        self.assertEqual(
+            {post.pk for post in response.context["cl"].result_list},
+            {self.django_post.pk, self.other_post.pk},
+        )
+        response = self.client.get(
+            reverse("admin:blogapp_comment_changelist"), {"q": "pruning"}
+        )
+        self.assertEqual(
+            [comment.pk for comment in response.context["cl"].result_list],
+            [self.comment.pk],
+        )
+
+    def test_admin_comment_search_covers_author_and_post(self):
+        admin = User.objects.create_superuser(username="root", password="pass")
+        self.client.force_login(admin)
+        other = Comment.objects.create(
+            post=self.django_post, author=admin, text="Nice one"
+        )
+        url = reverse("admin:blogapp_comment_changelist")
+        for q, expected in [
+            ("garden", {self.comment.pk}),
+            ("SEARCH", {self.comment.pk}),
+            ("nice", {other.pk}),
+            ("tips root", {other.pk}),
+        ]:
+            with self.subTest(q=q):
+                response = self.client.get(url, {"q": q})
+                self.assertEqual(
+                    {comment.pk for comment in response.context["cl"].result_list},
+                    expected,
+                )
+
+    def test_admin_autocomplete_matches_partial_titles(self):
+        admin = User.objects.create_superuser(username="root", password="pass")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "tip",
+                "app_label": "blogapp",
+                "model_name": "comment",
+                "field_name": "post",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["id"] for result in response.json()["results"]],
+            [str(self.django_post.pk)],
+        )
+
+
+@override_settings(BLOG_RESPONSE_CACHE_TIMEOUT=0)
+class AsyncReadEndpointTest(BlogAPITestCase):
+    """The async read endpoints return the same bodies as the DRF views."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="async", password="pass")
+        for i in range(12):
+            post = Post.objects.create(
+                title=f"Post {i}", content="Body", author=self.user
+            )
+            Comment.objects.create(post=post, author=self.user, text=f"Comment {i}")
+        self.post = post
+
+    def assertSameBody(self, sync_url, async_url):
+        expected = self.client.get(sync_url)
+        actual = self.client.get(async_url)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(
+            actual.json(),
+            json.loads(expected.content.decode().replace("/posts/", "/async/posts/")),
+        )
+
+    def test_post_list(self):
+        self.assertSameBody(reverse("post-list-create"), reverse("async-post-list"))
+        self.assertSameBody(
+            reverse("post-list-create") + "?page=2&page_size=5",
+            reverse("async-post-list") + "?page=2&page_size=5",
+        )
+        self.assertSameBody(
+            reverse("post-list-create") + "?page=9",
+            reverse("async-post-list") + "?page=9",
+        )
+
+    def test_post_detail(self):
+        self.assertSameBody(
+            reverse("post-detail", args=[self.post.pk]),
+            reverse("async-post-detail", args=[self.post.pk]),
+        )
+        self.assertSameBody(
+            reverse("post-detail", args=[0]), reverse("async-post-detail", args=[0])
+        )
+
+    def test_comment_list(self):
+        self.assertSameBody(
+            reverse("comment-list-create", args=[self.post.pk]),
+            reverse("async-comment-list", args=[self.post.pk]),
+        )
+
+    def test_read_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse("async-post-list"), {"title": "x"})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_runs_on_event_loop(self):
+        # Lazy queries in an async view raise SynchronousOnlyOperation.
+        response = await self.async_client.get(reverse("async-post-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 10)
+        response = await self.async_client.get(reverse("async-health-check"))
+        self.assertEqual(response.json()["status"], "ok")
+
+
+@override_settings(BLOG_RESPONSE_CACHE_TIMEOUT=0, BLOG_METRICS_DIR=None)
+class MetricsTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.user = User.objects.create_user(username="metrics", password="pass")
+        self.post = Post.objects.create(title="Hi", content="Body", author=self.user)
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def sample(self, text, series):
+        match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+        self.assertIsNotNone(match, f"{series} not in\n{text}")
+        return float(match.group(1))
+
+    def test_records_request_metrics(self):
+        self.client.get(reverse("post-list-create"))
+        self.client.get(reverse("post-list-create"))
+        self.client.get(reverse("post-detail", args=[self.post.pk]))
+        text = self.scrape()
+
+        labels = 'route="post-list-create",method="GET"'
+        self.assertEqual(
+            self.sample(
+                text,
+                f'blog_http_request_duration_seconds_count{{{labels},status="200"}}',
+            ),
+            2,
+        )
+        self.assertEqual(
+            self.sample(text, f"blog_db_queries_per_request_sum{{{labels}}}"), 6
+        )
+        self.assertGreater(
+            self.sample(text, f"blog_db_query_duration_seconds_sum{{{labels}}}"), 0
+        )
+        self.assertGreater(
+            self.sample(text, f"blog_serialization_duration_seconds_sum{{{labels}}}"),
+            0,
+        )
+        self.assertGreater(
+            self.sample(
+                text,
+                f'blog_http_response_size_bytes_sum{{{labels},status="200"}}',
+            ),
+            0,
+        )
+        self.assertIn('route="post-detail"', text)
+        # Scrapes are not recorded.
+        self.assertNotIn('route="metrics"', text)
+
+    def test_buckets_are_cumulative(self):
+        self.client.get(reverse("post-list-create"))
+        text = self.scrape()
+        series = (
+            'blog_db_queries_per_request_bucket{route="post-list-create",method="GET"'
+        )
+        self.assertEqual(self.sample(text, f'{series},le="2.0"}}'), 0)
+        self.assertEqual(self.sample(text, f'{series},le="3.0"}}'), 1)
+        self.assertEqual(self.sample(text, f'{series},le="+Inf"}}'), 1)
+
+    def test_scrape_is_limited_to_allowed_networks(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.7")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(BLOG_METRICS_ALLOWED_NETWORKS=["203.0.113.0/24"]):
+            response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.7")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get("/metrics")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_records_async_requests(self):
+        url = reverse("async-post-detail", args=[self.post.pk])
+        response = await AsyncClient().get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await AsyncClient().get("/metrics")
+        text = response.content.decode()
+        labels = 'route="async-post-detail",method="GET"'
+        self.assertEqual(
+            self.sample(
+                text,
+                f'blog_http_request_duration_seconds_count{{{labels},status="200"}}',
+            ),
+            1,
+        )
+        self.assertGreater(
+            self.sample(text, f"blog_db_queries_per_request_sum{{{labels}}}"), 0
+        )
+
+    def test_aggregates_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(BLOG_METRICS_DIR=directory):
+                self.client.get(reverse("post-list-create"))
+                # Another worker process that served the same route twice.
+                other = metrics.MetricsRegistry(directory=directory, pid=-1)
+                for _ in range(2):
+                    other.observe(
+                        metrics.REQUEST_DURATION,
+                        0.02,
+                        route="post-list-create",
+                        method="GET",
+                        status=200,
+                    )
+                other.flush()
+                text = self.scrape()
+        series = (
+            "blog_http_request_duration_seconds_count"
+            '{route="post-list-create",method="GET",status="200"}'
+        )
+        self.assertEqual(self.sample(text, series), 3)
+
+
+class CachedJWTAuthenticationTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="cached", password="pass")
+        self.post = Post.objects.create(title="Hi", content="Body", author=self.user)
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse("post-like-toggle", args=[self.post.pk])
+
+    def user_lookups(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(self.url)
+        lookups = [
+            query
+            for query in ctx.captured_queries
+            if query["sql"].startswith('SELECT "auth_user"')
+        ]
+        return response, len(lookups)
+
+    def test_user_is_looked_up_once(self):
+        response, lookups = self.user_lookups()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(lookups, 1)
+        response, lookups = self.user_lookups()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(lookups, 0)
+
+    def test_deactivation_invalidates(self):
+        self.user_lookups()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response, _ = self.user_lookups()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        self.user_lookups()
+        cached = caches[settings.BLOG_AUTH_CACHE_ALIAS]
+        key = f"blog:auth:user:{self.user.pk}"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new-pass")
+            self.user.save()
+            # Still cached until the transaction commits.
+            self.assertIsNotNone(cached.get(key))
+        self.assertIsNone(cached.get(key))
+        _, lookups = self.user_lookups()
+        self.assertEqual(lookups, 1)
+        self.assertEqual(
+            cached.get(key)["password_hash"],
+            get_md5_hash_password(self.user.password),
+        )
+
+    def test_cache_holds_no_password(self):
+        self.user_lookups()
+        entry = caches[settings.BLOG_AUTH_CACHE_ALIAS].get(
+            f"blog:auth:user:{self.user.pk}"
+        )
+        self.assertNotIn("password", entry["fields"])
+        self.assertNotIn(self.user.password, repr(entry))
+        token = RefreshToken.for_user(self.user).access_token
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        with self.assertNumQueries(0):
+            user, _ = CachedJWTAuthentication().authenticate(request)
+        self.assertEqual((user.pk, user.username), (self.user.pk, "cached"))
+        # Saving a cached user leaves the password alone.
+        user.first_name = "Cached"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Cached")
+        self.assertTrue(self.user.check_password("pass"))
+
+    def test_stateless_mode_uses_claims(self):
+        response = self.client.post(
+            reverse("token_obtain_pair"), {"username": "cached", "password": "pass"}
+        )
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+        with self.assertNumQueries(0):
+            user, _ = StatelessJWTAuthentication().authenticate(request)
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.username, "cached")
+        self.assertFalse(user.is_staff)
+        # Usable wherever a User is expected, e.g. as a post's author.
+        post = Post.objects.create(title="Stateless", content="Body", author=user)
+        self.assertEqual(post.author_id, self.user.pk)
+
+
+class HealthCheckTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        health.readiness.clear()
+        self.addCleanup(health.readiness.clear)
+
+    def test_liveness_short_circuits(self):
+        with self.assertNumQueries(0):
+            response = self.client.get("/health/live/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"status": "ok"})
+        # Answered before the session and CSRF middleware run.
+        self.assertNotIn("Vary", response)
+        self.assertNotIn("X-Frame-Options", response)
+
+    def test_readiness_probes(self):
+        response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        checks = response.json()["checks"]
+        self.assertEqual(set(checks), {"database", "migrations", "cache", "disk"})
+        self.assertTrue(all(c["status"] == "ok" for c in checks.values()))
+
+    def test_readiness_is_cached(self):
+        self.client.get("/health/ready/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with override_settings(BLOG_HEALTH_CACHE_SECONDS=0):
+            # Migrations stay checked; only the database probe queries again.
+            with self.assertNumQueries(1):
+                self.client.get("/health/ready/")
+
+    def test_failing_probe_is_not_ready(self):
+        with override_settings(MEDIA_ROOT="/nonexistent/media"):
+            response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        body = response.json()
+        self.assertEqual(body["status"], "fail")
+        self.assertEqual(body["checks"]["disk"]["status"], "fail")
+        self.assertIn("/nonexistent/media", body["checks"]["disk"]["error"])
+        self.assertEqual(body["checks"]["database"]["status"], "ok")
+
+    async def test_async_paths(self):
+        client = AsyncClient()
+        response = await client.get("/health/live/")
+        self.assertEqual(response.json(), {"status": "ok"})
+        self.assertNotIn("Vary", response)
+        response = await client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["status"], "ok")
+
+    async def test_asgi_answers_on_the_event_loop(self):
+        # No sync-only middleware above or below forces a thread hop.
+        threads = []
+
+        def live_response(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return JsonResponse(*args, **kwargs)
+
+        with mock.patch.object(health, "JsonResponse", live_response):
+            await AsyncClient().get("/health/live/")
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+class PostListViewTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.user = User.objects.create_user(username="reader", password="pass")
+        self.client.force_login(self.user)
+        self.url = reverse("post_list")
+
+    def make_posts(self, count):
+        Post.objects.bulk_create(
+            Post(title=f"Post {i}", content="Body", author=self.user)
+            for i in range(count)
+        )
+
+    def test_paginated(self):
+        self.make_posts(12)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context["posts"]), 10)
+        self.assertContains(response, "?page=2")
+        self.assertNotContains(response, "Newer posts")
+        response = self.client.get(self.url, {"page": 2})
+        self.assertEqual(len(response.context["posts"]), 2)
+        self.assertContains(response, "Newer posts")
+        self.assertNotContains(response, "Older posts")
+
+    def test_queries_do_not_grow_with_table(self):
+        self.make_posts(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        self.make_posts(50)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url)
+        self.assertEqual(len(small), len(large))
+        [page_query] = [q["sql"] for q in large if "blogapp_post" in q["sql"]]
+        self.assertNotIn("COUNT", page_query)
+        self.assertNotIn('"blogapp_post"."likes_count"', page_query)
+        self.assertNotIn('"auth_user"."password"', page_query)
+
+    def test_fragments_follow_post_version(self):
+        post = Post.objects.create(title="Original", content="Body", author=self.user)
+        self.assertContains(self.client.get(self.url), "Original")
+        # A write that bypasses save() leaves the cached fragment in place...
+        Post.objects.filter(pk=post.pk).update(title="Sneaky")
+        self.assertContains(self.client.get(self.url), "Original")
+        # ...while a normal edit moves updated_at and re-renders it.
+        post.refresh_from_db()
+        post.title = "Edited"
+        post.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Edited")
+        self.assertNotContains(response, "Original")
+
+
+class PostDetailViewTest(BlogAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="reader", password="pass")
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(title="Hi", content="Body", author=self.user)
+        self.url = reverse("post_detail_gui", args=[self.post.pk])
+        self.comments_url = reverse("post_comments_gui", args=[self.post.pk])
+
+    def make_comments(self, count):
+        now = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(
+                post=self.post,
+                author=self.user,
+                text=f"Comment {i}",
+                created_date=now - timedelta(minutes=count - i),
+            )
+            for i in range(count)
+        )
+
+    def blog_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [q for q in ctx.captured_queries if "blogapp_" in q["sql"]]
+
+    def test_first_page_of_comments_is_rendered(self):
+        self.make_comments(25)
+        response, queries = self.blog_queries(self.url)
+        self.assertEqual(len(queries), 2)  # post + author, comments + authors
+        self.assertContains(response, "Comment 24")
+        self.assertContains(response, "Comment 15")
+        self.assertNotContains(response, "Comment 14")
+        self.assertContains(response, 'id="comments-more"')
+
+    def test_older_comments_load_incrementally(self):
+        self.make_comments(25)
+        next_url = self.client.get(self.url).context["older_comments_url"]
+        seen = []
+        while next_url:
+            response, queries = self.blog_queries(next_url)
+            self.assertEqual(len(queries), 1)
+            seen += [c.text for c in response.context["comments"]]
+            next_url = response.get("X-Next-Page")
+        self.assertEqual(seen, [f"Comment {i}" for i in range(14, -1, -1)])
+
+    def test_no_more_link_for_short_threads(self):
+        self.make_comments(3)
+        response = self.client.get(self.url)
+        self.assertIsNone(response.context["older_comments_url"])
+        self.assertNotContains(response, 'id="comments-more"')
+
+    def test_create_returns_rendered_comment(self):
+        response = self.client.post(
+            self.comments_url,
+            {"text": "Nice <post>"},
+            HTTP_X_REQUESTED_WITH="fetch",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get()
+        self.assertContains(response, f'id="comment-{comment.pk}"', status_code=201)
+        self.assertContains(response, "Nice &lt;post&gt;", status_code=201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_plain_form_post_redirects(self):
+        response = self.client.post(self.comments_url, {"text": "Hello"})
+        self.assertRedirects(response, self.url)
+        response = self.client.post(self.comments_url, {"text": "  "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.comments_url, {"cursor": "nope"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommentStreamTest(BlogAPITestCase):
+    """Comment events reach the SSE stream of their post, and resume by id."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="stream", password="pass")
+        self.post = Post.objects.create(title="Live", content="Body", author=self.user)
+        self.url = reverse("comment-stream", args=[self.post.pk])
+        hub = events.CommentHub(history=3)
+        patchers = [
+            mock.patch.object(events, "hub", hub),
+            mock.patch.object(events, "_backend", events.LocalBackend(hub)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def history(self):
+        return [
+            (event.name, event.data["id"])
+            for event in events.hub._histories.get(self.post.pk, ())
+        ]
+
+    def test_comment_changes_publish_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            comment = Comment.objects.create(
+                post=self.post, author=self.user, text="Hi"
+            )
+            self.assertEqual(self.history(), [])
+        for callback in callbacks:
+            callback()
+        with self.captureOnCommitCallbacks(execute=True):
+            comment_id = comment.pk
+            comment.delete()
+        self.assertEqual(
+            self.history(),
+            [("comment-created", comment_id), ("comment-deleted", comment_id)],
+        )
+        created = events.hub._histories[self.post.pk][0]
+        self.assertEqual(created.data["author"], "stream")
+        self.assertEqual(created.data["post_id"], self.post.pk)
+
+    def test_bulk_create_publishes_each_comment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            comments = Comment.objects.bulk_create(
+                Comment(post=self.post, author=self.user, text=f"C{i}")
+                for i in range(2)
+            )
+        self.assertEqual(self.history(), [("comment-created", c.pk) for c in comments])
+
+    async def test_backlog_resumes_after_last_event_id(self):
+        published = [
+            events.Event(self.post.pk, "comment-deleted", {"id": i}) for i in range(5)
+        ]
+        for event in published:
+            events.hub.deliver(event)
+        # Only the last three are kept.
+        subscription, backlog = events.hub.subscribe(self.post.pk, published[2].id)
+        self.assertEqual(backlog, published[3:])
+        events.hub.unsubscribe(subscription)
+        subscription, backlog = events.hub.subscribe(self.post.pk, published[0].id)
+        self.assertIsNone(backlog)
+        events.hub.unsubscribe(subscription)
+        subscription, backlog = events.hub.subscribe(self.post.pk, "garbage")
+        self.assertIsNone(backlog)
+        events.hub.unsubscribe(subscription)
+        self.assertEqual(events.hub.subscriber_count(), 0)
+
+    async def test_backlog_follows_delivery_order_not_ids(self):
+        # Two workers published at once; the later id reached Redis first.
+        later = events.Event(self.post.pk, "comment-deleted", {"id": 1}, id="20-0")
+        earlier = events.Event(self.post.pk, "comment-deleted", {"id": 2}, id="10-0")
+        events.hub.deliver(later)
+        events.hub.deliver(earlier)
+        subscription, backlog = events.hub.subscribe(self.post.pk, later.id)
+        self.assertEqual(backlog, [earlier])
+        events.hub.unsubscribe(subscription)
+        subscription, backlog = events.hub.subscribe(self.post.pk, earlier.id)
+        self.assertEqual(backlog, [])
+        events.hub.unsubscribe(subscription)
+
+    async def test_slow_subscriber_is_reset(self):
+        hub = events.CommentHub(queue_size=1)
+        subscription, _ = hub.subscribe(self.post.pk)
+        for i in range(2):
+            hub.deliver(events.Event(self.post.pk, "comment-deleted", {"id": i}))
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.overflowed)
+
+    async def test_stream(self):
+        seen = events.Event(self.post.pk, "comment-deleted", {"id": 0})
+        missed = events.Event(self.post.pk, "comment-deleted", {"id": 1})
+        events.hub.deliver(seen)
+        events.hub.deliver(missed)
+
+        response = await AsyncClient().get(self.url, headers={"Last-Event-ID": seen.id})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        self.assertEqual(await anext(stream), missed.encode().encode())
+        self.assertEqual(events.hub.subscriber_count(self.post.pk), 1)
+
+        events.publish(self.post.pk, "comment-created", {"id": 2, "text": "Hi"})
+        chunk = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertIn("event: comment-created\n", chunk)
+        self.assertIn('data: {"id":2,"text":"Hi"}\n\n', chunk)
+
+        # The ASGI handler cancels the response when the client disconnects.
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(events.hub.subscriber_count(), 0)
+
+    async def test_stream_without_history_resets(self):
+        response = await AsyncClient().get(self.url, {"last_event_id": "1-1"})
+        stream = response.streaming_content
+        await anext(stream)
+        self.assertEqual(await anext(stream), b"event: reset\ndata: {}\n\n")
+        await stream.aclose()
+
+    async def test_unknown_post(self):
+        response = await AsyncClient().get(reverse("comment-stream", args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_needs_asgi(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class PostExportTest(BlogAPITestCase):
+    """Streaming NDJSON/CSV export through the API and the command."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="pass")
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        for i in range(5):
+            post = Post.objects.create(title=f"P{i}", content="C", author=self.user)
+            Post.objects.like(post.pk, self.admin)
+            for j in range(i % 3):
+                Comment.objects.create(post=post, author=self.admin, text=f"c{j}")
+
+    def _authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+
+    def test_admin_only(self):
+        url = reverse("post-export", args=["ndjson"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self._authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ndjson(self):
+        self._authenticate(self.admin)
+        response = self.client.get(reverse("post-export", args=["ndjson"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        body = b"".join(response.streaming_content).decode()
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r["title"] for r in records], [f"P{i}" for i in range(5)])
+        self.assertEqual({r["likes_count"] for r in records}, {1})
+        self.assertEqual([r["text"] for r in records[2]["comments"]], ["c1", "c0"])
+        self.assertEqual(records[2]["comments"][0]["author"], "admin")
+        self.assertEqual(records[2]["comments_count"], 2)
+
+    def test_csv(self):
+        self._authenticate(self.admin)
+        response = self.client.get(reverse("post-export", args=["csv"]))
+        self.assertEqual(response["Content-Type"], "text/csv")
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual(len(rows), 5 + Comment.objects.count())
+        self.assertEqual(
+            [(r["type"], r["title"] or r["text"]) for r in rows[:4]],
+            [("post", "P0"), ("post", "P1"), ("comment", "c0"), ("post", "P2")],
+        )
+        self.assertEqual(rows[2]["post_id"], rows[1]["id"])
+
+    def test_unknown_format(self):
+        self._authenticate(self.admin)
+        response = self.client.get("/api/posts/export.xml")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_one_cursor_and_one_prefetch_per_chunk(self):
+        for chunk_size, expected in [(2, 4), (5, 2), (100, 2)]:
+            with self.subTest(chunk_size=chunk_size):
+                with CaptureQueriesContext(connection) as queries:
+                    chunks = export.ndjson_export(chunk_size=chunk_size)
+                    first = next(chunks)
+                    self.assertEqual(len(queries), 2)
+                    rest = list(chunks)
+                self.assertEqual(len(queries), expected)
+                lines = (first + "".join(rest)).splitlines()
+                self.assertEqual(len(lines), 5)
+
+    def test_csv_header_before_any_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            header = next(export.csv_export())
+        self.assertEqual(header.strip(), ",".join(export.CSV_COLUMNS))
+        self.assertEqual(len(queries), 0)
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        token = RefreshToken.for_user(self.admin).access_token
+        in_chunks_of_two = functools.partial(export.export, chunk_size=2)
+        with mock.patch.object(export, "export", in_chunks_of_two):
+            response = await AsyncClient().get(
+                reverse("post-export", args=["ndjson"]),
+                headers={"Authorization": f"Bearer {token}"},
+            )
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(
+            [len(chunk.decode().splitlines()) for chunk in chunks], [2, 2, 1]
+        )
+
+    async def test_aiterate_reads_one_chunk_at_a_time(self):
+        produced = []
+
+        def chunks():
+            for i in range(3):
+                produced.append(i)
+                yield str(i)
+
+        iterator = export.aiterate(chunks())
+        self.assertEqual(await anext(iterator), "0")
+        self.assertEqual(produced, [0])
+        self.assertEqual([chunk async for chunk in iterator], ["1", "2"])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("export_posts", "--chunk-size", "2", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/posts.csv"
+            call_command(
+                "export_posts", "--format", "csv", "-o", path, stderr=StringIO()
+            )
+            with open(path, newline="") as exported:
+                rows = list(csv.DictReader(exported))
+        self.assertEqual(rows[0]["title"], "P0")
+
+
+class AdminChangeListTest(BlogAPITestCase):
+    """The admin changelists run the same queries however many rows they show."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        self.client.force_login(self.admin)
+
+    def make_rows(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username=f"author{User.objects.count()}")
+            post = Post.objects.create(title=f"P{i}", content="C", author=author)
+            Post.objects.like(post.pk, self.admin)
+            Comment.objects.create(post=post, author=author, text=f"c{i}")
+
+    def assertConstantQueries(self, url, expected):
+        for rows in (2, 8):
+            self.make_rows(rows)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_post_changelist(self):
+        # Session, user, row estimate, count, page of posts with their authors.
+        response = self.assertConstantQueries(
+            reverse("admin:blogapp_post_changelist"), 5
+        )
+        self.assertContains(response, "author3")
+
+    def test_comment_changelist(self):
+        # Session, user, row estimate, count, page of comments with their
+        # authors and posts.
+        response = self.assertConstantQueries(
+            reverse("admin:blogapp_comment_changelist"), 5
+        )
+        self.assertContains(response, "author3")
+
+    def test_author_filter_loads_only_the_selected_author(self):
+        self.make_rows(3)
+        author = User.objects.get(username="author1")
+        url = reverse("admin:blogapp_comment_changelist")
+        # Session, user, count, page, and the selected author for the filter box.
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {"author__id__exact": author.pk})
+        self.assertEqual(
+            list(response.context["cl"].result_list),
+            list(Comment.objects.filter(author=author)),
+        )
+        self.assertContains(response, 'data-list-filter="author__id__exact"')
+        self.assertContains(response, f'<option value="{author.pk}" selected>')
+        response = self.client.get(url, {"author__id__exact": "x"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_comment_delete_confirmation(self):
+        url = reverse("admin:blogapp_comment_changelist")
+        counts = []
+        for rows in (2, 8):
+            self.make_rows(rows)
+            selected = list(Comment.objects.values_list("pk", flat=True))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    url, {"action": "delete_selected", "_selected_action": selected}
+                )
+            self.assertContains(response, "Comment by author1 on P0")
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    @skipUnless(connection.vendor == "sqlite", "reads sqlite_stat1")
+    def test_estimated_count(self):
+        self.make_rows(5)
+        queryset = Post.objects.order_by("-id")
+        self.assertIsNone(estimate_count(Post, "default"))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        Post.objects.filter(title="P0").delete()
+        self.assertEqual(estimate_count(Post, "default"), 5)
+
+        paginator = EstimatedCountPaginator(queryset, 2)
+        paginator.exact_count_limit = 5
+        self.assertEqual(paginator.count, 5)
+        paginator.exact_count_limit = 6
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 4)
+        filtered = EstimatedCountPaginator(queryset.filter(likes_count=1), 2)
+        filtered.exact_count_limit = 1
+        self.assertEqual(filtered.count, 4)
+
+
+THROTTLE_TEST_RATES = {
+    "like.user": "2/min",
+    "like.ip": "3/min",
+    "comment.user": "1/min",
+    "comment_bulk.user": "1/min",
+}
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": THROTTLE_TEST_RATES,
+    }
+)
+class ThrottleTest(BlogAPITestCase):
+    """Token-bucket limits on likes and comment creation."""
+
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            User.objects.create_user(username=f"user{i}", password="pass")
+            for i in range(2)
+        ]
+        self.post = Post.objects.create(
+            title="Post", content="Content", author=self.users[0]
+        )
+        self.like_url = reverse("post-like-toggle", args=[self.post.pk])
+
+    def authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {str(refresh.access_token)}"
+        )
+
+    def test_user_limit_rejects_before_database(self):
+        self.authenticate(self.users[0])
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.like_url).status_code, 200)
+        # The user is cached by the authentication class: nothing else runs.
+        with self.assertNumQueries(0):
+            response = self.client.post(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response["Retry-After"]), (29, 30))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_ip_limit_spans_users(self):
+        for user in self.users:
+            self.authenticate(user)
+            for _ in range(2 if user is self.users[0] else 1):
+                self.assertEqual(self.client.put(self.like_url).status_code, 200)
+        response = self.client.put(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response["Retry-After"]), 20)
+        # Other addresses have buckets of their own.
+        response = self.client.put(self.like_url, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_comment_creation(self):
+        self.authenticate(self.users[0])
+        url = reverse("comment-list-create", args=[self.post.pk])
+        self.assertEqual(self.client.post(url, {"text": "a"}).status_code, 201)
+        response = self.client.post(url, {"text": "b"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response["Retry-After"]), 60)
+        # Reads are never throttled.
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_refused_request_gets_its_tokens_back(self):
+        self.authenticate(self.users[0])
+        for _ in range(2):
+            self.assertEqual(self.client.put(self.like_url).status_code, 200)
+        # The IP bucket grants this one, the user bucket refuses it.
+        response = self.client.put(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # So the address still has the token for another user.
+        self.authenticate(self.users[1])
+        self.assertEqual(self.client.put(self.like_url).status_code, 200)
+        response = self.client.put(self.like_url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bulk_comments_are_limited_per_request(self):
+        self.authenticate(self.users[0])
+        url = reverse("comment-bulk-create", args=[self.post.pk])
+        # Far more comments than the "comment" rate allows, in one request.
+        items = [{"text": f"c{i}"} for i in range(25)]
+        response = self.client.post(url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response["Retry-After"]), 60)
+        self.assertEqual(Comment.objects.count(), 25)
+        # The single-comment rate is a separate bucket.
+        response = self.client.post(
+            reverse("comment-list-create", args=[self.post.pk]), {"text": "one"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_comment_form(self):
+        self.client.force_login(self.users[0])
+        url = reverse("post_comments_gui", args=[self.post.pk])
+        response = self.client.post(url, {"text": "a"}, HTTP_X_REQUESTED_WITH="fetch")
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {"text": "b"}, HTTP_X_REQUESTED_WITH="fetch")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(int(response["Retry-After"]), 60)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_buckets_refill(self):
+        store = throttling.LocalBucketStore()
+        # 3 per 3000 ms: a burst of three, then one every second.
+        self.assertEqual(
+            [store.acquire("k", 1000, 3000, 0) for _ in range(4)], [0, 0, 0, 1000]
+        )
+        self.assertEqual(store.acquire("k", 1000, 3000, 500), 500)
+        self.assertEqual(store.acquire("k", 1000, 3000, 1000), 0)
+        self.assertEqual(store.acquire("k", 1000, 3000, 1000), 1000)
+        self.assertEqual(store.acquire("k", 1000, 3000, 10000), 0)
+
+    def test_shared_bucket_across_processes(self):
+        shared = throttling.CacheBucketStore(settings.BLOG_THROTTLE_CACHE_ALIAS)
+        workers = [
+            throttling.TokenBucketLimiter(throttling.LocalBucketStore(), shared)
+            for _ in range(3)
+        ]
+        waits = [worker.acquire("blog:throttle:test", 4, 60) for worker in workers * 2]
+        self.assertEqual(waits[:4], [0, 0, 0, 0])
+        self.assertTrue(all(wait > 0 for wait in waits[4:]))
+        # The refusing worker now refuses locally, without asking the cache.
+        with mock.patch.object(shared, "acquire") as acquire:
+            self.assertGreater(workers[1].acquire("blog:throttle:test", 4, 60), 0)
+        acquire.assert_not_called()
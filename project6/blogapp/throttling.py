@@ -0,0 +1,271 @@
+"""
+Token-bucket throttling for the write endpoints.
+
+A bucket holds up to ``num`` tokens and refills at ``num`` per period, so a
+rate of ``"30/min"`` allows a burst of 30 requests and then one every two
+seconds. Buckets are kept with the generic cell rate algorithm: the state is a
+single "theoretical arrival time" (TAT) that every granted request pushes one
+interval further, and a request is refused while the TAT is more than a period
+ahead of now.
+
+``TokenBucketLimiter`` checks two stores:
+
+* a ``LocalBucketStore`` in each process. It only sees that process's
+  requests, so it never holds fewer tokens than the shared bucket and a client
+  it refuses is refused without any network round trip;
+* a shared ``CacheBucketStore`` in the cache named by
+  ``BLOG_THROTTLE_CACHE_ALIAS`` (atomic ``incr`` on Redis or memcached), which
+  sees every worker's requests and has the final word.
+
+The throttle classes read their rates from DRF's ``DEFAULT_THROTTLE_RATES``
+under ``"<throttle_scope>.user"`` and ``"<throttle_scope>.ip"``; a missing rate
+disables that limit. DRF runs throttles after authentication and permissions
+but before the handler, so a refused request never reaches the database. A
+request refused by one bucket gets back the tokens the others already gave
+it. Plain Django views are throttled with the ``throttle`` decorator.
+"""
+
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"30/min"`` -> ``(30, 60)``; None stays None."""
+    if rate is None:
+        return None
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
+
+
+def _now_ms():
+    # Wall-clock time, so that every process agrees on the TAT.
+    return int(time.time() * 1000)
+
+
+class LocalBucketStore:
+    """Buckets of this process, the least recently used dropped first."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._tats = OrderedDict()
+
+    def acquire(self, key, interval, period, now):
+        """Take a token; return 0, or the milliseconds until one is free."""
+        with self._lock:
+            tat = max(self._tats.pop(key, now), now) + interval
+            wait = tat - now - period
+            if wait <= 0:
+                self._tats[key] = tat
+            else:
+                self._tats[key] = tat - interval
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+            return max(wait, 0)
+
+    def hold(self, key, interval, period, now, wait):
+        """Refuse ``key`` for ``wait`` ms, as the shared store just did."""
+        with self._lock:
+            self._tats[key] = now + wait + period - interval
+
+    def refund(self, key, interval):
+        """Give back a token taken with ``acquire()``."""
+        with self._lock:
+            if key in self._tats:
+                self._tats[key] -= interval
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+class CacheBucketStore:
+    """Buckets shared by every process through a cache's atomic ``incr``."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def acquire(self, key, interval, period, now):
+        """Take a token; return 0, or the milliseconds until one is free."""
+        cache = self.cache
+        # A TAT is never more than a period ahead once a request is granted,
+        # so a bucket that expired was full anyway.
+        timeout = math.ceil(period / 1000)
+        if cache.add(key, now + interval, timeout):
+            return 0
+        try:
+            tat = cache.incr(key, interval)
+        except ValueError:
+            # Expired between add() and incr().
+            cache.set(key, now + interval, timeout)
+            return 0
+        if tat - interval < now:
+            # The bucket had refilled completely; restart it from now. Two
+            # workers racing here can grant one extra request between them.
+            cache.set(key, now + interval, timeout)
+            return 0
+        wait = tat - now - period
+        if wait > 0:
+            cache.decr(key, interval)
+            return wait
+        cache.touch(key, timeout)
+        return 0
+
+    def refund(self, key, interval):
+        """Give back a token taken with ``acquire()``."""
+        try:
+            self.cache.decr(key, interval)
+        except ValueError:
+            # Expired, so the bucket is full anyway.
+            pass
+
+
+class TokenBucketLimiter:
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def acquire(self, key, num, duration):
+        """Take a token from ``key``'s bucket; return the seconds to wait, or 0."""
+        interval, period = self._interval(num, duration)
+        now = _now_ms()
+        wait = self.local.acquire(key, interval, period, now)
+        if wait or self.shared is None:
+            return wait / 1000
+        wait = self.shared.acquire(key, interval, period, now)
+        if wait:
+            self.local.hold(key, interval, period, now, wait)
+        return wait / 1000
+
+    def refund(self, key, num, duration):
+        """Give back the token of a granted ``acquire()``."""
+        interval = self._interval(num, duration)[0]
+        self.local.refund(key, interval)
+        if self.shared is not None:
+            self.shared.refund(key, interval)
+
+    def clear(self):
+        self.local.clear()
+
+    @staticmethod
+    def _interval(num, duration):
+        # Whole milliseconds, rounded so that the burst is still ``num``.
+        interval = math.ceil(duration * 1000 / num)
+        return interval, interval * num
+
+
+def _shared_store():
+    alias = getattr(settings, "BLOG_THROTTLE_CACHE_ALIAS", None)
+    return CacheBucketStore(alias) if alias else None
+
+
+limiter = TokenBucketLimiter(LocalBucketStore(), _shared_store())
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle the unsafe methods of views that set ``throttle_scope``, with the
+    rate configured for ``"<throttle_scope>.<kind>"``.
+    """
+
+    kind = None
+    methods = ("POST", "PUT", "PATCH", "DELETE")
+
+    def __init__(self):
+        self._wait = 0
+
+    def get_ident_for(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None or request.method not in self.methods:
+            return True
+        if getattr(request, "_blog_throttled", False):
+            # DRF asks every throttle; don't spend tokens on a refused request.
+            return True
+        rate = parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{self.kind}")
+        )
+        ident = self.get_ident_for(request)
+        if rate is None or ident is None:
+            return True
+        key = f"blog:throttle:{scope}.{self.kind}:{ident}"
+        self._wait = limiter.acquire(key, *rate)
+        if not self._wait:
+            request._blog_throttle_spent = [
+                *getattr(request, "_blog_throttle_spent", ()),
+                (key, *rate),
+            ]
+            return True
+        request._blog_throttled = True
+        # Another bucket already granted this request; give its token back.
+        for spent in getattr(request, "_blog_throttle_spent", ()):
+            limiter.refund(*spent)
+        request._blog_throttle_spent = []
+        return False
+
+    def wait(self):
+        return self._wait
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Per-user limit; anonymous requests are left to the per-IP limit."""
+
+    kind = "user"
+
+    def get_ident_for(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Per-client-address limit, honouring DRF's ``NUM_PROXIES``."""
+
+    kind = "ip"
+
+    def get_ident_for(self, request):
+        return self.get_ident(request)
+
+
+def throttle(scope):
+    """
+    Apply the ``DEFAULT_THROTTLE_CLASSES`` with ``scope`` to a plain Django
+    view, answering refused requests with ``429`` and ``Retry-After``.
+    """
+
+    def decorator(view_func):
+        view = SimpleNamespace(throttle_scope=scope)
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+                throttle = throttle_class()
+                if not throttle.allow_request(request, view):
+                    response = HttpResponse(
+                        "Too many requests, try again later.", status=429
+                    )
+                    response["Retry-After"] = str(math.ceil(throttle.wait()))
+                    return response
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,20 +1,35 @@
-from django.urls import path
+from django.urls import path, re_path
+from . import async_views
 from .views import (
     PostListCreate,
     PostRetrieveUpdateDestroy,
     PostDeleteAll,
+    PostDeleteJobStatus,
     PostLikeToggle,
+    PostBulk,
+    PostSearch,
+    PostExport,
     CommentListCreate,
     CommentDestroy,
+    CommentBulkCreate,
     post_list_view,
     post_detail_view,
+    post_comments_view,
     home,
     HealthCheckView,
+    ResponseCacheStats,
 )
 
 urlpatterns = [
     path("", home, name="home"),
     path("posts/", PostListCreate.as_view(), name="post-list-create"),
+    path("posts/bulk/", PostBulk.as_view(), name="post-bulk"),
+    path("posts/search/", PostSearch.as_view(), name="post-search"),
+    re_path(
+        r"^posts/export\.(?P<export_format>ndjson|csv)$",
+        PostExport.as_view(),
+        name="post-export",
+    ),
     path("posts/<int:pk>/", PostRetrieveUpdateDestroy.as_view(), name="post-detail"),
     path("posts/<int:pk>/like/", PostLikeToggle.as_view(), name="post-like-toggle"),
     path(
@@ -22,14 +37,44 @@ urlpatterns = [
         CommentListCreate.as_view(),
         name="comment-list-create",
     ),
+    path(
+        "posts/<int:post_pk>/comments/stream/",
+        async_views.comment_stream,
+        name="comment-stream",
+    ),
+    path(
+        "posts/<int:post_pk>/comments/bulk/",
+        CommentBulkCreate.as_view(),
+        name="comment-bulk-create",
+    ),
     path(
         "posts/<int:post_pk>/comments/<int:pk>/",
         CommentDestroy.as_view(),
         name="comment-destroy",
     ),
     path("posts/delete/", PostDeleteAll.as_view(), name="post-delete-all"),
+    path(
+        "posts/delete/<str:job_id>/",
+        PostDeleteJobStatus.as_view(),
+        name="post-delete-job",
+    ),
     path("posts/gui", post_list_view, name="post_list"),
     path("posts/gui/<int:pk>/", post_detail_view, name="post_detail_gui"),
+    path(
+        "posts/gui/<int:pk>/comments/",
+        post_comments_view,
+        name="post_comments_gui",
+    ),
+    path("cache/stats/", ResponseCacheStats.as_view(), name="response-cache-stats"),
     # Health check endpoint
     path("health/", HealthCheckView.as_view(), name="health-check"),
+    # Native async read endpoints, for ASGI deployments
+    path("async/posts/", async_views.post_list, name="async-post-list"),
+    path("async/posts/<int:pk>/", async_views.post_detail, name="async-post-detail"),
+    path(
+        "async/posts/<int:post_pk>/comments/",
+        async_views.comment_list,
+        name="async-comment-list",
+    ),
+    path("async/health/", async_views.health, name="async-health-check"),
 ]
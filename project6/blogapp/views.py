@@ -9,22 +9,133 @@ Ensure that the API returns JSON responses.
 """
 
 from rest_framework import generics, permissions, response, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.reverse import reverse
+from .cache import CachedResponseMixin, response_cache
+from .conditional import ConditionalRequestMixin, make_validators
+from .deletion import ChunkedPostDeleter, get_job, start_delete_job
+from . import export
 from .models import Post, Comment
-from .serializers import PostSerializer, CommentSerializer
-from django.shortcuts import render, get_object_or_404
+from .pagination import CommentCursorPagination, PostCursorPagination, PostPagination
+from . import search
+from .serializers import CommentSerializer, PostBulkDeleteSerializer, PostSerializer
+from .throttling import throttle
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import redirect, render, get_object_or_404
+from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.utils import timezone
 
 
-class PostPagination(PageNumberPagination):
-    """Custom pagination for Post list view."""
+class PaginationModeMixin:
+    """
+    Let clients switch a list view to keyset pagination.
+
+    ``?pagination=cursor`` (or any request carrying a ``cursor`` parameter)
+    uses ``cursor_pagination_class``; otherwise ``pagination_class`` applies.
+    """
+
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return self.cursor_pagination_class is not None and (
+            params.get("pagination") == "cursor" or "cursor" in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+
+class PostFieldsMixin:
+    """
+    Sparse fieldsets for the post endpoints.
+
+    ``?fields=id,title,author`` limits the output to those fields, and neither
+    serializes nor loads the rest: unrequested columns are deferred, and the
+    author join and comment prefetch are dropped. When ``fields`` is given,
+    comments are only embedded if listed there or with ``?expand=comments``.
+    ``?comments_limit=N`` embeds only the N newest comments of each post.
+    """
 
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
+    max_comments_limit = 100
+
+    def get_requested_fields(self):
+        """Return the requested field names, or None for the full representation."""
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = self._parse_fields()
+        return self._requested_fields
+
+    def get_comments_limit(self):
+        value = self.request.query_params.get("comments_limit")
+        if value is None or self.request.method not in permissions.SAFE_METHODS:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValidationError({"comments_limit": "Must be an integer."})
+        if limit < 0:
+            raise ValidationError({"comments_limit": "Must not be negative."})
+        return min(limit, self.max_comments_limit)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        limit = self.get_comments_limit()
+        if fields is None and limit is None:
+            return queryset
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if fields is None:
+            return queryset.select_related("author").with_comments(limit)
+
+        columns = {"id", "published_date"}  # pk and keyset pagination
+        for name in fields:
+            if name == "author":
+                queryset = queryset.select_related("author")
+                columns.update({"author", "author__username"})
+            elif name == "comments":
+                queryset = queryset.with_comments(limit)
+            else:
+                columns.add(name)
+        return queryset.only(*columns)
+
+    def _parse_fields(self):
+        params = self.request.query_params
+        if (
+            "fields" not in params
+            or self.request.method not in permissions.SAFE_METHODS
+        ):
+            return None
+        fields = {name.strip() for name in params["fields"].split(",") if name.strip()}
+        allowed = set(PostSerializer.Meta.fields)
+        unknown = fields - allowed
+        if unknown:
+            raise ValidationError(
+                {
+                    "fields": f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                    f"Choose from: {', '.join(PostSerializer.Meta.fields)}."
+                }
+            )
+        expand = {name.strip() for name in params.get("expand", "").split(",")}
+        if "comments" in expand:
+            fields.add("comments")
+        return fields
 
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
@@ -39,44 +150,109 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         return obj.author == request.user
 
 
-class PostListCreate(generics.ListCreateAPIView):
+class PostListCreate(
+    CachedResponseMixin,
+    PostFieldsMixin,
+    PaginationModeMixin,
+    generics.ListCreateAPIView,
+):
     """List all posts or create a new post. Only authenticated users can create."""
 
-    queryset = Post.objects.all().order_by("-published_date")
+    queryset = Post.objects.with_details().order_by("-published_date", "-id")
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = PostPagination
+    cursor_pagination_class = PostCursorPagination
+
+    def get_cache_scopes(self):
+        return ["post-list"]
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        response_cache.invalidate("post-list")
 
 
-class PostRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class PostRetrieveUpdateDestroy(
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    PostFieldsMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """Retrieve, update, or delete a post by id. Only the author can modify."""
 
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_details()
     serializer_class = PostSerializer
     lookup_field = "pk"
     permission_classes = [IsAuthorOrReadOnly]
 
+    def get_cache_scopes(self):
+        return [f"post:{self.kwargs['pk']}"]
+
+    def get_validators(self):
+        row = (
+            Post.objects.filter(pk=self.kwargs["pk"])
+            .with_last_comment_date()
+            .values_list(
+                "pk",
+                "published_date",
+                "updated_at",
+                "likes_count",
+                "comments_count",
+                "last_comment_date",
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        return make_validators(*row, timestamps=(row[1], row[2], row[5]))
+
     def perform_update(self, serializer):
         serializer.save(author=self.request.user)
+        response_cache.invalidate_post(serializer.instance.pk)
 
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        instance.delete()
+        response_cache.invalidate_post(pk)
 
-class CommentListCreate(generics.ListCreateAPIView):
+
+class CommentListCreate(
+    ConditionalRequestMixin, PaginationModeMixin, generics.ListCreateAPIView
+):
     """List or create comments for a specific post. Only authenticated users can create."""
 
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cursor_pagination_class = CommentCursorPagination
+    # Only creating comments is throttled; listing is a safe method.
+    throttle_scope = "comment"
 
     def get_queryset(self):
         post_id = self.kwargs["post_pk"]
-        return Comment.objects.filter(post_id=post_id).order_by("-created_date")
+        return (
+            Comment.objects.filter(post_id=post_id)
+            .select_related("author")
+            .order_by("-created_date", "-id")
+        )
+
+    def get_validators(self):
+        row = (
+            Post.objects.filter(pk=self.kwargs["post_pk"])
+            .with_last_comment_date()
+            .values_list("pk", "comments_count", "last_comment_date", "updated_at")
+            .first()
+        )
+        if row is None:
+            return None
+        # updated_at also moves when a comment is deleted, unlike the newest
+        # comment's date, so Last-Modified never goes backwards.
+        return make_validators(*row[:3], timestamps=(row[2], row[3]))
 
     def perform_create(self, serializer):
         post_id = self.kwargs["post_pk"]
         post = get_object_or_404(Post, pk=post_id)
         serializer.save(author=self.request.user, post=post)
+        response_cache.invalidate_post(post.pk)
 
 
 class CommentDestroy(generics.DestroyAPIView):
@@ -90,55 +266,344 @@ class CommentDestroy(generics.DestroyAPIView):
         post_id = self.kwargs["post_pk"]
         return Comment.objects.filter(post_id=post_id)
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        response_cache.invalidate_post(instance.post_id)
+
 
 class PostLikeToggle(generics.GenericAPIView):
-    """Toggle like on a post. Only authenticated users can like posts."""
+    """
+    Like or unlike a post. Only authenticated users can like posts.
+
+    ``POST`` toggles the current user's like, while ``PUT`` (like) and
+    ``DELETE`` (unlike) set it explicitly so clients can retry them safely.
+    """
 
     queryset = Post.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "like"
 
     def post(self, request, pk):
         """Toggle like status for the current user on the post."""
-        post = get_object_or_404(Post, pk=pk)
-        user = request.user
-
-        if post.likes.filter(id=user.id).exists():
-            post.likes.remove(user)
-            liked = False
-        else:
-            post.likes.add(user)
-            liked = True
-
+        return self._set_like(pk, None)
+
+    def put(self, request, pk):
+        """Like the post; liking an already liked post is a no-op."""
+        return self._set_like(pk, True)
+
+    def delete(self, request, pk):
+        """Unlike the post; unliking a post that is not liked is a no-op."""
+        return self._set_like(pk, False)
+
+    def _set_like(self, pk, liked):
+        try:
+            liked, changed, likes_count = Post.objects.set_like(
+                pk, self.request.user, liked
+            )
+        except Post.DoesNotExist:
+            raise Http404
+        if changed:
+            response_cache.invalidate_post(pk)
         return response.Response(
-            {"liked": liked, "likes_count": post.likes.count()},
+            {"liked": liked, "likes_count": likes_count},
             status=status.HTTP_200_OK,
         )
 
 
 class PostDeleteAll(generics.DestroyAPIView):
-    """Delete all posts. Only admin users can perform this action."""
+    """
+    Delete all posts. Only admin users can perform this action.
+
+    Posts, comments and likes are removed in bounded chunks by a background
+    job; the response carries the job id to poll for progress.
+    """
 
     queryset = Post.objects.all()
     permission_classes = [permissions.IsAdminUser]
+    chunk_size = 1000
 
     def delete(self, request, *args, **kwargs):
-        deleted_count, _ = Post.objects.all().delete()
-        return response.Response(
-            {"message": f"{deleted_count} posts deleted"},
-            status=status.HTTP_204_NO_CONTENT,
+        job = start_delete_job(chunk_size=self.chunk_size)
+        job["status_url"] = reverse(
+            "post-delete-job", kwargs={"job_id": job["job_id"]}, request=request
+        )
+        return response.Response(job, status=status.HTTP_202_ACCEPTED)
+
+
+class PostDeleteJobStatus(APIView):
+    """Report the progress of a delete-all job. Only admin users can view it."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None:
+            raise Http404
+        return Response(job)
+
+
+class BulkCreateMixin:
+    """
+    Validate an array of items one by one and insert the valid ones with one
+    chunked ``bulk_create`` inside a single transaction. Invalid items are
+    reported per index without aborting the rest of the batch.
+    """
+
+    bulk_max_items = 1000
+    bulk_batch_size = 100
+
+    def bulk_create(self, model, serializer_class, **extra):
+        items = self.request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"detail": "Expected a non-empty list of items."})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                {"detail": f"At most {self.bulk_max_items} items per request."}
+            )
+
+        results, pending = [], []
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item)
+            if serializer.is_valid():
+                pending.append((index, model(**serializer.validated_data, **extra)))
+            else:
+                results.append(
+                    {"index": index, "status": 400, "errors": serializer.errors}
+                )
+
+        with transaction.atomic():
+            created = model.objects.bulk_create(
+                [obj for _, obj in pending], batch_size=self.bulk_batch_size
+            )
+        results.extend(
+            {"index": index, "status": 201, "id": obj.pk}
+            for (index, _), obj in zip(pending, created)
+        )
+        results.sort(key=lambda result: result["index"])
+
+        failed = len(items) - len(created)
+        if not failed:
+            code = status.HTTP_201_CREATED
+        elif created:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {"created": len(created), "failed": failed, "results": results},
+            status=code,
+        )
+
+
+class PostBulk(BulkCreateMixin, APIView):
+    """
+    Create or delete posts in bulk.
+
+    ``POST`` takes an array of posts authored by the current user. ``DELETE``
+    removes the posts matching the ``ids``, ``author``, ``published_before``
+    and ``published_after`` query parameters; users other than admins can
+    only delete their own posts.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        result = self.bulk_create(Post, PostSerializer, author=request.user)
+        response_cache.invalidate("post-list")
+        return result
+
+    def delete(self, request):
+        filters = PostBulkDeleteSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        data = filters.validated_data
+
+        posts = Post.objects.all()
+        if not request.user.is_staff:
+            posts = posts.filter(author=request.user)
+        if "ids" in data:
+            posts = posts.filter(pk__in=data["ids"])
+        if "author" in data:
+            posts = posts.filter(author__username=data["author"])
+        if "published_before" in data:
+            posts = posts.filter(published_date__lt=data["published_before"])
+        if "published_after" in data:
+            posts = posts.filter(published_date__gte=data["published_after"])
+
+        # Comments and likes go in bounded batches, each in its own short
+        # transaction, instead of one collector pass over every related row.
+        deleted = ChunkedPostDeleter(queryset=posts).run()
+        return Response({"deleted": deleted["posts"]})
+
+
+class CommentBulkCreate(BulkCreateMixin, APIView):
+    """Create comments for a post in bulk. Only authenticated users can create."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    # Limited per request, not per comment, so that a batch of up to
+    # bulk_max_items always fits; the rate is set separately from "comment".
+    throttle_scope = "comment_bulk"
+
+    def post(self, request, post_pk):
+        post = get_object_or_404(Post, pk=post_pk)
+        result = self.bulk_create(
+            Comment, CommentSerializer, post=post, author=request.user
         )
+        response_cache.invalidate_post(post.pk)
+        return result
+
+
+class PostSearch(generics.GenericAPIView):
+    """
+    Full-text search over post titles, post bodies and comments.
+
+    ``?q=`` is required. Hits are ranked, paginated like the post list and
+    carry a highlighted ``snippet``; comment hits point at their post.
+    """
+
+    pagination_class = PostPagination
+
+    def get(self, request):
+        results = search.search(request.query_params.get("q", ""))
+        if results is None:
+            raise ValidationError({"q": ["Enter at least one word to search for."]})
+        page = self.paginate_queryset(results)
+        return self.get_paginated_response(page)
+
+
+class PostExport(APIView):
+    """
+    Stream every post with its comments and like count as NDJSON or CSV
+    (``posts/export.<format>``). Only admin users can download it.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, export_format):
+        content_type, chunks = export.export(export_format)
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.aiterate(chunks)
+        filename = f"posts-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+class ResponseCacheStats(APIView):
+    """Report response cache hit/miss counters. Only admin users can view them."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+POSTS_PER_PAGE = 10
 
 
 @login_required
 def post_list_view(request):
-    posts = Post.objects.all().order_by("-published_date")
-    return render(request, "blogapp/post_list.html", {"posts": posts})
+    """
+    One page of posts, newest first.
+
+    The page is fetched with one extra row to tell whether an older page
+    exists, so there is no ``COUNT(*)`` whose cost grows with the table, and only
+    the columns the template shows are loaded. Each post's markup is cached in a
+    template fragment keyed on its ``updated_at`` (see ``post_list.html``).
+    """
+    try:
+        number = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        number = 1
+    offset = (number - 1) * POSTS_PER_PAGE
+    posts = list(
+        Post.objects.select_related("author")
+        .only("title", "content", "published_date", "updated_at", "author__username")
+        .order_by("-published_date", "-id")[offset : offset + POSTS_PER_PAGE + 1]
+    )
+    context = {
+        "posts": posts[:POSTS_PER_PAGE],
+        "page_number": number,
+        "has_previous": number > 1,
+        "has_next": len(posts) > POSTS_PER_PAGE,
+    }
+    return render(request, "blogapp/post_list.html", context)
+
+
+COMMENTS_PER_PAGE = CommentCursorPagination.page_size
+
+
+def _older_comments_url(request, post_pk, comments):
+    """URL of the page of comments after ``comments``, the first page shown."""
+    cursor = CommentCursorPagination().encode_cursor(comments[-1])
+    url = reverse("post_comments_gui", args=[post_pk], request=request)
+    return f"{url}?{CommentCursorPagination.cursor_query_param}={cursor}"
 
 
 @login_required
 def post_detail_view(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    return render(request, "blogapp/post_detail.html", {"post": post})
+    """
+    A post with its first page of comments, in two queries: the post with its
+    author, and one prefetch of the newest comments with theirs. Older comments
+    are loaded page by page from ``post_comments_view`` as the reader scrolls.
+    """
+    post = get_object_or_404(
+        Post.objects.select_related("author").with_comments(
+            limit=COMMENTS_PER_PAGE + 1
+        ),
+        pk=pk,
+    )
+    comments = post.recent_comments[:COMMENTS_PER_PAGE]
+    has_more = len(post.recent_comments) > COMMENTS_PER_PAGE
+    context = {
+        "post": post,
+        "comments": comments,
+        "older_comments_url": (
+            _older_comments_url(request, post.pk, comments) if has_more else None
+        ),
+    }
+    return render(request, "blogapp/post_detail.html", context)
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+@throttle("comment")
+def post_comments_view(request, pk):
+    """
+    HTML fragments for the comments of ``post_detail.html``.
+
+    GET returns the page of comments after ``?cursor=`` with the URL of the
+    next one in ``X-Next-Page``. POST creates a comment and returns its markup
+    for the page to prepend, or redirects back to the post for plain form
+    submissions.
+    """
+    if request.method == "POST":
+        post = get_object_or_404(Post.objects.only("pk"), pk=pk)
+        text = request.POST.get("text", "").strip()
+        if not text:
+            return HttpResponseBadRequest("A comment needs some text.")
+        comment = Comment.objects.create(post=post, author=request.user, text=text)
+        response_cache.invalidate_post(post.pk)
+        if request.headers.get("X-Requested-With") != "fetch":
+            return redirect("post_detail_gui", pk=post.pk)
+        return render(
+            request, "blogapp/_comment.html", {"comment": comment}, status=201
+        )
+
+    queryset = (
+        Comment.objects.filter(post_id=pk)
+        .select_related("author")
+        .order_by("-created_date", "-id")
+    )
+    paginator = CommentCursorPagination()
+    try:
+        comments = paginator.paginate_queryset(queryset, Request(request))
+    except NotFound:
+        raise Http404("Invalid cursor")
+    response = render(request, "blogapp/_comment_list.html", {"comments": comments})
+    next_url = paginator.get_next_link()
+    if next_url:
+        response["X-Next-Page"] = next_url
+    return response
 
 
 def home(request):
@@ -157,8 +622,8 @@ class HealthCheckView(APIView):
         """
         Return a simple health check response
         """
-        # You can add more sophisticated health checks here
-        # e.g., database connectivity, cache status, etc.
+        # Probes of the database, migrations, cache and disk live in
+        # blogapp.health and are served at /health/ready/.
         return Response(
             {
                 "status": "ok",
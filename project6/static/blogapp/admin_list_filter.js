@@ -0,0 +1,18 @@
+// Autocomplete list filters (blogapp.admin.AutocompleteListFilter): reload the
+// changelist with the picked object, or without the filter when cleared.
+'use strict';
+{
+  const $ = django.jQuery;
+  $(function () {
+    $('select[data-list-filter]').on('change', function () {
+      const params = new URLSearchParams(window.location.search);
+      params.delete('p');
+      if (this.value) {
+        params.set(this.dataset.listFilter, this.value);
+      } else {
+        params.delete(this.dataset.listFilter);
+      }
+      window.location.search = params.toString();
+    });
+  });
+}
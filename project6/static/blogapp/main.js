@@ -1,13 +1,108 @@
-fetch('/api/posts/')
-  .then(res => res.json())
-  .then(data => {
-    const postDiv = document.getElementById('posts');
-    data.forEach(post => {
-      postDiv.innerHTML += `
-        <h3>${post.title}</h3>
-        <p>${post.content}</p>
-        <a href="/posts/${post.id}/">View Comments</a>
-        <hr/>
-      `;
-    });
+// Comments on the post detail page (blogapp/post_detail.html). The first page
+// is rendered by the server; this appends new comments from the markup the
+// server returns, loads older pages as the reader scrolls and follows the
+// comment stream so that other readers' comments show up live.
+
+function submitComment(form, list) {
+  form.addEventListener('submit', function (e) {
+    e.preventDefault();
+    fetch(form.action, {
+      method: 'POST',
+      headers: { 'X-Requested-With': 'fetch' },
+      body: new FormData(form),
+      credentials: 'same-origin'
+    })
+      .then(res => {
+        if (res.ok) return res.text();
+        if (res.status === 429) {
+          throw new Error('You are commenting too fast. Wait a minute and try again.');
+        }
+        throw new Error('Comment failed. Check the text and try again.');
+      })
+      .then(html => {
+        const empty = document.getElementById('no-comments');
+        if (empty) empty.remove();
+        list.insertAdjacentHTML('afterbegin', html);
+        form.reset();
+      })
+      .catch(err => alert(err.message));
   });
+}
+
+function loadOlderComments(sentinel, list) {
+  let loading = false;
+  const observer = new IntersectionObserver(entries => {
+    if (!entries[0].isIntersecting || loading) return;
+    loading = true;
+    fetch(sentinel.dataset.next, { credentials: 'same-origin' })
+      .then(res => {
+        if (!res.ok) throw new Error('Could not load older comments.');
+        const next = res.headers.get('X-Next-Page');
+        return res.text().then(html => ({ html, next }));
+      })
+      .then(({ html, next }) => {
+        list.insertAdjacentHTML('beforeend', html);
+        if (next) {
+          sentinel.dataset.next = next;
+        } else {
+          observer.disconnect();
+          sentinel.remove();
+        }
+      })
+      .catch(err => {
+        observer.disconnect();
+        sentinel.textContent = err.message;
+      })
+      .finally(() => { loading = false; });
+  });
+  observer.observe(sentinel);
+}
+
+function renderComment(comment) {
+  const item = document.createElement('div');
+  item.className = 'comment';
+  item.id = 'comment-' + comment.id;
+  const text = document.createElement('p');
+  text.style.whiteSpace = 'pre-line';
+  text.textContent = comment.text;
+  const meta = document.createElement('p');
+  const small = document.createElement('small');
+  small.textContent = comment.author + ' \u00b7 ' +
+    new Date(comment.created_date).toLocaleString();
+  meta.appendChild(small);
+  item.append(text, meta);
+  return item;
+}
+
+function followComments(list) {
+  // EventSource reconnects by itself and resends the last event id, so the
+  // server replays whatever arrived in between.
+  const source = new EventSource(list.dataset.stream);
+  source.addEventListener('comment-created', function (e) {
+    const comment = JSON.parse(e.data);
+    // Our own comments were already inserted by submitComment.
+    if (document.getElementById('comment-' + comment.id)) return;
+    const empty = document.getElementById('no-comments');
+    if (empty) empty.remove();
+    list.prepend(renderComment(comment));
+  });
+  source.addEventListener('comment-deleted', function (e) {
+    const item = document.getElementById('comment-' + JSON.parse(e.data).id);
+    if (item) item.remove();
+  });
+  source.addEventListener('reset', function () {
+    // Events were missed: the page is the only consistent view left.
+    source.close();
+    window.location.reload();
+  });
+  window.addEventListener('pagehide', () => source.close());
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  const list = document.getElementById('comments');
+  const form = document.getElementById('comment-form');
+  const sentinel = document.getElementById('comments-more');
+  if (form && list) submitComment(form, list);
+  if (sentinel && list) loadOlderComments(sentinel, list);
+  if (list && list.dataset.stream && window.EventSource) followComments(list);
+});